@@ -0,0 +1,79 @@
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from core.page_cache import invalidate_page_cache
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время ответа и размер JSON API '
+        'с отрисовкой тех же данных в html.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз запрашивать каждый адрес.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Сбрасывать кэш страниц перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--fields', default='',
+            help='Значение ?fields= для запросов к API.'
+        )
+
+    def handle(self, *args, **options):
+        self.client = Client()
+        for name, html_url, api_url in self.get_pairs():
+            if options['fields']:
+                api_url += f'?fields={options["fields"]}'
+            html = self.measure(html_url, options['repeat'], options['cold'])
+            api = self.measure(api_url, options['repeat'], options['cold'])
+            self.stdout.write(
+                f'{name:8} html {html[0]:7.1f} мс {html[1] / 1024:7.1f} КБ'
+                f'   api {api[0]:7.1f} мс {api[1] / 1024:7.1f} КБ'
+            )
+
+    def get_pairs(self):
+        pairs = [('index', reverse('posts:index'), reverse('api:post_list'))]
+        post = Post.objects.order_by('-pk').values_list('pk', flat=True)
+        if post:
+            pairs.append((
+                'post',
+                reverse('posts:post_detail', args=(post[0],)),
+                reverse('api:post_detail', args=(post[0],)),
+            ))
+        slug = Group.objects.values_list('slug', flat=True).first()
+        if slug:
+            pairs.append((
+                'group',
+                reverse('posts:group_list', args=(slug,)),
+                reverse('api:group_posts', args=(slug,)),
+            ))
+        username = User.objects.values_list('username', flat=True).first()
+        if username:
+            pairs.append((
+                'profile',
+                reverse('posts:profile', args=(username,)),
+                reverse('api:profile_posts', args=(username,)),
+            ))
+        return pairs
+
+    def measure(self, url, repeat, cold):
+        """Медиана времени ответа в мс и размер ответа в байтах."""
+        timings, size = [], 0
+        for _ in range(repeat):
+            if cold:
+                invalidate_page_cache()
+            started = time.perf_counter()
+            response = self.client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            size = len(response.content)
+        return median(timings), size
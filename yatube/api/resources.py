@@ -0,0 +1,114 @@
+from django.db.models import Count
+
+from posts.models import Post
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+class Resource:
+    """Поля ресурса API и колонки базы, из которых они берутся.
+
+    Запрос читает только колонки выбранных через ?fields= полей и отдаёт
+    кортежи values_list, так что объекты моделей не создаются вовсе.
+    """
+
+    def __init__(self, fields, default, annotations=None, converters=None):
+        self.fields = fields
+        self.default = default
+        self.annotations = annotations or {}
+        self.converters = converters or {}
+
+    def requested(self, request):
+        """Имена полей из ?fields=; ValueError, если есть неизвестные."""
+        value = request.GET.get('fields')
+        if not value:
+            return list(self.default)
+        names = list(dict.fromkeys(
+            name.strip() for name in value.split(',') if name.strip()
+        ))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(', '.join(unknown))
+        return names
+
+    def values(self, queryset, names, *extra):
+        """values_list с колонками полей names и дополнительными extra."""
+        annotations = {
+            name: self.annotations[name]
+            for name in names if name in self.annotations
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset.values_list(
+            *(self.fields[name] for name in names), *extra
+        )
+
+    def serialize(self, names, row):
+        item = dict(zip(names, row))
+        for name, convert in self.converters.items():
+            if name in item:
+                item[name] = convert(item[name])
+        return item
+
+
+POST = Resource(
+    fields={
+        'id': 'pk',
+        'text': 'text',
+        'text_html': 'text_html',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'width': 'width',
+        'height': 'height',
+    },
+    default=('id', 'text', 'pub_date', 'author', 'group', 'image'),
+    converters={
+        'image': image_url,
+        # 0 — картинку не удалось прочитать, размеры неизвестны.
+        'width': lambda value: value or None,
+        'height': lambda value: value or None,
+    },
+)
+
+COMMENT = Resource(
+    fields={
+        'id': 'pk',
+        'post': 'post_id',
+        'text': 'text',
+        'created': 'created',
+        'author': 'author__username',
+    },
+    default=('id', 'text', 'created', 'author'),
+)
+
+GROUP = Resource(
+    fields={
+        'id': 'pk',
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    },
+    default=('slug', 'title', 'description'),
+)
+
+PROFILE = Resource(
+    fields={
+        'id': 'pk',
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'posts_count': 'posts_count',
+        'followers_count': 'followers_count',
+    },
+    default=('username', 'first_name', 'last_name', 'posts_count'),
+    annotations={
+        'posts_count': Count('posts', distinct=True),
+        'followers_count': Count('following', distinct=True),
+    },
+)
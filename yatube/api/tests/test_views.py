@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.page_cache import page_cache_version
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(API_PAGE_SIZE=2)
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Заголовок', slug='slug', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pagination(self):
+        """Лента отдаётся порциями, next ведёт к следующей порции."""
+        response = self.client.get(reverse('api:post_list'))
+        data = response.json()
+        self.assertEqual(
+            [post['text'] for post in data['results']], ['Пост 2', 'Пост 1']
+        )
+        data = self.client.get(data['next']).json()
+        self.assertEqual(
+            [post['text'] for post in data['results']], ['Пост 0']
+        )
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fieldsets(self):
+        """?fields= выбирает поля ответа и колонки запроса."""
+        url = reverse('api:post_detail', args=(self.posts[0].pk,))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'fields': 'id,author'})
+        self.assertEqual(
+            response.json(), {'id': self.posts[0].pk, 'author': 'author'}
+        )
+        response = self.client.get(url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304."""
+        url = reverse('api:group_posts', args=(self.group.slug,))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_etag(self):
+        """Подписка меняет followers_count, а с ним и ETag профиля."""
+        url = reverse('api:profile_detail', args=('reader',))
+        params = {'fields': 'username,followers_count'}
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()['followers_count'], 0)
+        version = page_cache_version()
+        Follow.objects.create(user=self.author, author=self.reader)
+        response = self.client.get(
+            url, params, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['followers_count'], 1)
+        # Кэш остальных страниц сайта подписка не сбрасывает.
+        self.assertEqual(page_cache_version(), version)
+
+    def test_missing_object_not_modified_is_404(self):
+        """Условный запрос к несуществующему объекту получает 404."""
+        for url in (
+            reverse('api:post_detail', args=(999,)),
+            reverse('api:profile_detail', args=('nobody',)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, 404)
+
+    def test_resources(self):
+        """Комментарии, профиль и группа отдаются в JSON."""
+        post_id = self.posts[0].pk
+        cases = [
+            (reverse('api:post_comments', args=(post_id,)), 'text,author', {
+                'results': [{'text': 'Комментарий', 'author': 'reader'}],
+                'next': None,
+            }),
+            (reverse('api:profile_detail', args=('author',)), '', {
+                'username': 'author', 'first_name': '', 'last_name': '',
+                'posts_count': 3,
+            }),
+            (reverse('api:group_detail', args=('slug',)), 'slug,title', {
+                'slug': 'slug', 'title': 'Заголовок',
+            }),
+        ]
+        for url, fields, expected in cases:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'fields': fields})
+                self.assertEqual(response.json(), expected)
+
+    def test_not_found_and_follow_feed(self):
+        """Ошибки отдаются JSON, лента подписок только авторизованным."""
+        response = self.client.get(reverse('api:profile_posts', args=('x',)))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено.'})
+        self.assertEqual(
+            self.client.get(reverse('api:follow_feed')).status_code, 401
+        )
+        client = Client()
+        client.force_login(self.reader)
+        data = client.get(
+            reverse('api:follow_feed'), {'fields': 'text'}
+        ).json()
+        self.assertEqual(
+            data['results'], [{'text': 'Пост 2'}, {'text': 'Пост 1'}]
+        )
@@ -0,0 +1,210 @@
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from api.resources import COMMENT, GROUP, POST, PROFILE
+from core.page_cache import page_cache_key, page_cache_version
+from posts.follow_cache import followers_version, following_ids
+from posts.models import Comment, Group, Post, User
+from posts.pagination import after_cursor, decode_cursor, encode_cursor
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def api_view(view):
+    """Отвечает на ошибки API в JSON, а не html-страницей."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': 'Метод не поддерживается.'}, 405)
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Не найдено.'}, 404)
+        except ApiError as error:
+            return json_response({'detail': error.detail}, error.status)
+    return wrapper
+
+
+def object_key(kwargs):
+    """Объект ответа по аргументам адреса; у профиля — с версией подписок."""
+    parts = [f'{name}={value}' for name, value in sorted(kwargs.items())]
+    if 'username' in kwargs:
+        parts.append(f'followers={followers_version(kwargs["username"])}')
+    return ':'.join(parts)
+
+
+def response_key(request, kwargs):
+    return f'api:{page_cache_key(request)}:{object_key(kwargs)}'
+
+
+def response_etag(key):
+    return md5(key.encode()).hexdigest()
+
+
+def public_etag(request, *args, **kwargs):
+    """ETag общего ответа: версия кэша страниц, адрес и объект.
+
+    Считается, только если ответ уже лежит в кэше, — значит, при этой
+    версии объект существовал. Иначе ETag нет: представление само ищет
+    объект и на несуществующий отвечает 404, а не 304. Повторный запрос
+    с If-None-Match получает 304, не трогая базу.
+    """
+    key = response_key(request, kwargs)
+    request.api_cached = cache.get(key)
+    if request.api_cached is None:
+        return None
+    return response_etag(key)
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    following = md5(following_ids(request.user).tobytes()).hexdigest()
+    return f'v{page_cache_version()}-{request.user.pk}-{following}'
+
+
+def cached(view):
+    """Кэширует тело ответа под тем же ключом с версией, что и страницы.
+
+    Тело из кэша уже прочитал public_etag.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        content = getattr(request, 'api_cached', None)
+        if content is not None:
+            return HttpResponse(content, content_type='application/json')
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            key = response_key(request, kwargs)
+            cache.set(key, response.content, settings.PAGE_CACHE_TIMEOUT)
+            response['ETag'] = quote_etag(response_etag(key))
+        return response
+    return wrapper
+
+
+def public(view):
+    """Общий для всех ответ: ETag, кэш и ошибки в JSON."""
+    return api_view(condition(etag_func=public_etag)(cached(view)))
+
+
+def requested(resource, request):
+    try:
+        return resource.requested(request)
+    except ValueError as error:
+        raise ApiError(f'Неизвестные поля: {error}')
+
+
+def get_one(resource, request, queryset):
+    names = requested(resource, request)
+    row = resource.values(queryset, names).first()
+    if row is None:
+        raise Http404
+    return json_response(resource.serialize(names, row))
+
+
+def paginated(resource, request, queryset, date_field):
+    """Порция записей после ?cursor= и адрес следующей порции.
+
+    К колонкам выбранных полей добавляются дата и pk для курсора.
+    """
+    names = requested(resource, request)
+    cursor = request.GET.get('cursor')
+    try:
+        cursor = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise ApiError('Некорректный курсор.')
+    descending = date_field == 'pub_date'
+    queryset = after_cursor(queryset, cursor, date_field, descending)
+    size = settings.API_PAGE_SIZE
+    rows = list(resource.values(queryset, names, date_field, 'pk')[:size + 1])
+    next_url = None
+    if len(rows) > size:
+        query = request.GET.copy()
+        query['cursor'] = encode_cursor(*rows[size - 1][-2:])
+        next_url = f'{request.path}?{query.urlencode()}'
+    return json_response({
+        'results': [
+            resource.serialize(names, row[:-2]) for row in rows[:size]
+        ],
+        'next': next_url,
+    })
+
+
+@public
+def post_list(request):
+    return paginated(POST, request, Post.objects.visible(), 'pub_date')
+
+
+@public
+def post_detail(request, post_id):
+    return get_one(POST, request, Post.objects.visible().filter(pk=post_id))
+
+
+@public
+def post_comments(request, post_id):
+    if not Post.objects.visible().filter(pk=post_id).exists():
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id)
+    return paginated(COMMENT, request, comments, 'created')
+
+
+@public
+def group_detail(request, slug):
+    return get_one(GROUP, request, Group.objects.filter(slug=slug))
+
+
+@public
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        raise Http404
+    posts = Post.objects.visible().filter(group_id=group_id)
+    return paginated(POST, request, posts, 'pub_date')
+
+
+@public
+def profile_detail(request, username):
+    return get_one(PROFILE, request, User.objects.filter(
+        username=username, is_active=True
+    ))
+
+
+@public
+def profile_posts(request, username):
+    author_id = User.objects.filter(
+        username=username, is_active=True
+    ).values_list('pk', flat=True).first()
+    if author_id is None:
+        raise Http404
+    posts = Post.objects.visible().filter(author_id=author_id)
+    return paginated(POST, request, posts, 'pub_date')
+
+
+@api_view
+@condition(etag_func=follow_etag)
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация.', 401)
+    posts = Post.objects.visible().filter(
+        author_id__in=list(following_ids(request.user))
+    )
+    return paginated(POST, request, posts, 'pub_date')
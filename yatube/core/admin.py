@@ -0,0 +1,35 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from core.mail import schedule_flush
+from core.models import OutboxMessage, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'name', 'status', 'priority', 'attempts', 'run_at', 'error',
+    )
+    list_filter = ('status', 'name')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Task.QUEUED, attempts=0, run_at=timezone.now(), error=''
+        )
+    retry.short_description = 'Повторить сейчас'
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'status', 'attempts', 'send_after', 'error')
+    list_filter = ('status',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.update(
+            status=OutboxMessage.PENDING, attempts=0,
+            send_after=timezone.now(), error='',
+        )
+        schedule_flush()
+    retry.short_description = 'Отправить снова'
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from core.ratelimit import parse_rate
+
+
+@register()
+def check_rate_limits(app_configs, **kwargs):
+    """Неверный RATE_LIMITS должен ронять запуск, а не давать 500."""
+    errors = []
+    for scope, rate in getattr(settings, 'RATE_LIMITS', {}).items():
+        if not rate:
+            continue
+        try:
+            parse_rate(rate)
+        except ValueError as error:
+            errors.append(Error(
+                f'RATE_LIMITS[{scope!r}]: {error}',
+                id='core.E001',
+            ))
+    return errors
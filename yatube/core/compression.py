@@ -0,0 +1,91 @@
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'application/rss+xml', 'application/atom+xml',
+    'image/svg+xml',
+)
+ZLIB_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+def supported_encodings():
+    if brotli is not None:
+        return ('br', 'gzip', 'deflate')
+    return ('gzip', 'deflate')
+
+
+def quality(params):
+    for param in params:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 0
+    return 1
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding без тех, что запрещены через q=0."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = part.split(';')
+        if quality(params) > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(request):
+    """Лучшее из поддерживаемых сжатий, которое принимает клиент."""
+    accepted = accepted_encodings(request)
+    for encoding in supported_encodings():
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def is_compressible(response):
+    # Content-Range ответа 206 описывает несжатые байты: сжатое тело
+    # под ним клиент соберёт в испорченный файл.
+    return (
+        response.status_code == 200
+        and not response.has_header('Content-Range')
+        and not response.has_header('Content-Encoding')
+        and response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)
+        and (
+            response.streaming
+            or len(response.content) >= settings.COMPRESS_MIN_LENGTH
+        )
+    )
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data)
+    compressor = zlib.compressobj(
+        settings.COMPRESS_LEVEL, zlib.DEFLATED, ZLIB_WBITS[encoding]
+    )
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток, отдавая сжатые данные после каждого куска."""
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(
+        settings.COMPRESS_LEVEL, zlib.DEFLATED, ZLIB_WBITS[encoding]
+    )
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
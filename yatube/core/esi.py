@@ -0,0 +1,32 @@
+import re
+from urllib.parse import parse_qsl, urlencode
+
+FRAGMENTS = {}
+
+INCLUDE_RE = re.compile(rb'<esi:include src="([\w-]+)\?([^"]*)"/>')
+
+
+def fragment(name):
+    """Регистрирует функцию, рисующую персональный фрагмент страницы."""
+    def decorator(func):
+        FRAGMENTS[name] = func
+        return func
+    return decorator
+
+
+def include_tag(name, params):
+    """Метка, на место которой позже подставится фрагмент."""
+    return f'<esi:include src="{name}?{urlencode(params)}"/>'
+
+
+def render_fragment(request, name, params):
+    return FRAGMENTS[name](request, **params)
+
+
+def render_holes(request, content):
+    """Подставляет в общий html персональные фрагменты пользователя."""
+    def replace(match):
+        name = match.group(1).decode()
+        params = dict(parse_qsl(match.group(2).decode()))
+        return render_fragment(request, name, params).encode()
+    return INCLUDE_RE.sub(replace, content)
@@ -0,0 +1,122 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from core.compression import accepted_encodings
+
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def requested_range(request, size, etag, last_modified):
+    """Единственный диапазон из заголовка Range или None для всего файла.
+
+    Несколько диапазонов и некорректный заголовок отдаются целым файлом,
+    как допускает RFC 7233. Невыполнимый диапазон вызывает ValueError.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header or request.method != 'GET':
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, http_date(last_modified)):
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+        if end < start:
+            raise ValueError('Пустой диапазон.')
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Диапазон за пределами файла.')
+    return start, end
+
+
+def read_range(fullpath, start, length):
+    with open(fullpath, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(FileResponse.block_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, fullpath, cache_control, precompressed=False,
+               offload=None):
+    """Отдаёт файл потоком с ETag, Last-Modified, 304 и диапазонами.
+
+    При precompressed выбирает лежащую рядом .br или .gz копию по
+    заголовку Accept-Encoding. Если задан offload и настроен
+    SENDFILE_HEADER, тело не читается вовсе: прокси получает заголовок
+    X-Accel-Redirect или X-Sendfile и отдаёт файл сам.
+    """
+    content_type, _ = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    encoding = None
+    if precompressed:
+        accepted = accepted_encodings(request)
+        for name, suffix in PRECOMPRESSED:
+            if name in accepted and os.path.isfile(fullpath + suffix):
+                fullpath, encoding = fullpath + suffix, name
+                break
+    if not os.path.isfile(fullpath):
+        raise Http404
+    stat = os.stat(fullpath)
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        response = file_response(
+            request, fullpath, stat, etag, content_type, offload
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    if precompressed:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def file_response(request, fullpath, stat, etag, content_type, offload):
+    if offload and settings.SENDFILE_HEADER:
+        response = HttpResponse(content_type=content_type)
+        response[settings.SENDFILE_HEADER] = offload
+        return response
+    try:
+        byte_range = requested_range(
+            request, stat.st_size, etag, stat.st_mtime
+        )
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range is None:
+        response = FileResponse(
+            open(fullpath, 'rb'), content_type=content_type
+        )
+        response['Content-Length'] = stat.st_size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(fullpath, start, end - start + 1),
+            status=206, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,8 @@
+from django.template.loader import render_to_string
+
+from core.esi import fragment
+
+
+@fragment('header_user')
+def header_user(request):
+    return render_to_string('includes/header_user.html', request=request)
@@ -0,0 +1,214 @@
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from core.models import OutboxMessage, Task
+from core.tasks import backoff, current_task, task, task_name
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_message(message):
+    """Письмо в виде словаря для JSON; вложения не поддерживаются."""
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+
+
+def deserialize_message(data, connection=None):
+    return EmailMultiAlternatives(connection=connection, **data)
+
+
+def claim(now):
+    """Следующее письмо, которое пора отправить, или None.
+
+    Как и задачи очереди, письмо занимается условным UPDATE, так что два
+    воркера не отправят его дважды.
+    """
+    ready = (
+        Q(status=OutboxMessage.PENDING, send_after__lte=now)
+        | Q(status=OutboxMessage.SENDING, locked_until__lt=now)
+    )
+    for pk in OutboxMessage.objects.filter(ready).values_list(
+        'pk', flat=True
+    )[:10]:
+        if OutboxMessage.objects.filter(ready, pk=pk).update(
+            status=OutboxMessage.SENDING,
+            locked_until=now + timedelta(seconds=settings.TASK_TIMEOUT),
+        ):
+            return OutboxMessage.objects.get(pk=pk)
+    return None
+
+
+def claimed(outbox):
+    """Письмо, пока оно за этим воркером.
+
+    Когда блокировка истекла и письмо взял другой воркер, итог пишет он:
+    медленный не затрёт его статус и не удалит строку.
+    """
+    return OutboxMessage.objects.filter(
+        pk=outbox.pk, locked_until=outbox.locked_until
+    )
+
+
+def failed(outbox, error):
+    outbox.attempts += 1
+    outbox.error = f'{type(error).__name__}: {error}'
+    if outbox.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        outbox.status = OutboxMessage.FAILED
+    else:
+        outbox.status = OutboxMessage.PENDING
+        outbox.send_after = timezone.now() + timedelta(
+            seconds=backoff(outbox.attempts)
+        )
+    if not claimed(outbox).update(
+        attempts=outbox.attempts, error=outbox.error, status=outbox.status,
+        send_after=outbox.send_after, locked_until=None,
+    ):
+        logger.warning('Письмо %s уже взял другой воркер', outbox.pk)
+
+
+def send_outbox(limit=None):
+    """Отправляет готовые письма через одно соединение.
+
+    Между письмами выдерживается пауза, чтобы не превышать
+    EMAIL_RATE_LIMIT писем в секунду. Письмо, которое не удалось отправить,
+    откладывается на повтор, а соединение переоткрывается. Если сервер
+    недоступен и соединение не открывается, ошибка выходит наружу.
+    Возвращает число отправленных и отложенных писем.
+    """
+    rate = settings.EMAIL_RATE_LIMIT
+    interval = 1 / rate if rate else 0
+    sent = retried = 0
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    connection.open()
+    try:
+        while limit is None or sent + retried < limit:
+            outbox = claim(timezone.now())
+            if outbox is None:
+                break
+            started = time.monotonic()
+            try:
+                message = deserialize_message(
+                    json.loads(outbox.message), connection
+                )
+                connection.send_messages([message])
+            except Exception as error:
+                logger.exception('Письмо %s не отправлено', outbox.pk)
+                failed(outbox, error)
+                retried += 1
+                connection.close()
+                connection.open()
+            else:
+                if not claimed(outbox).delete()[0]:
+                    logger.warning(
+                        'Письмо %s уже взял другой воркер', outbox.pk
+                    )
+                sent += 1
+            pause = interval - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+    finally:
+        connection.close()
+    return sent, retried
+
+
+def next_attempt():
+    """Когда появится следующее письмо для отправки, или None.
+
+    Это ближайший повтор отложенного письма или конец блокировки письма,
+    которое взял и, возможно, не отправил упавший воркер.
+    """
+    times = OutboxMessage.objects.aggregate(
+        pending=Min('send_after', filter=Q(status=OutboxMessage.PENDING)),
+        sending=Min('locked_until', filter=Q(status=OutboxMessage.SENDING)),
+    )
+    times = [value for value in times.values() if value is not None]
+    return min(times) if times else None
+
+
+def other_flush_running():
+    """Отправляет ли письма flush_outbox другого воркера прямо сейчас."""
+    running = Task.objects.filter(
+        name=task_name(flush_outbox),
+        status=Task.RUNNING,
+        locked_until__gte=timezone.now(),
+    )
+    job = current_task()
+    if job is not None:
+        running = running.exclude(pk=job.pk)
+    return running.exists()
+
+
+@task(priority=10)
+def flush_outbox():
+    """Отправляет до EMAIL_BATCH_SIZE писем и планирует следующий запуск.
+
+    Письма отправляет один воркер за раз, иначе темп вышел бы кратным
+    EMAIL_RATE_LIMIT: если уже идёт другая отправка, задача только
+    откладывается. Если почтовый сервер недоступен, письма ждут и попытки
+    не тратятся, а задача повторится через TASK_RETRY_DELAY.
+    """
+    if other_flush_running():
+        schedule_flush(countdown=settings.TASK_RETRY_DELAY)
+        return
+    delay = 0
+    try:
+        send_outbox(limit=settings.EMAIL_BATCH_SIZE)
+    except Exception:
+        logger.exception('Почтовый сервер недоступен')
+        delay = settings.TASK_RETRY_DELAY
+    next_at = next_attempt()
+    if next_at is not None:
+        schedule_flush(countdown=max(
+            delay, (next_at - timezone.now()).total_seconds()
+        ))
+
+
+def schedule_flush(countdown=0):
+    """Ставит flush_outbox в очередь не позже чем через countdown секунд.
+
+    В очереди не бывает больше одной ждущей отправки: если она уже есть,
+    её срок только приближается.
+    """
+    run_at = timezone.now() + timedelta(seconds=countdown)
+    queued = Task.objects.filter(
+        name=task_name(flush_outbox), status=Task.QUEUED
+    )
+    if queued.exists():
+        queued.filter(run_at__gt=run_at).update(run_at=run_at)
+    else:
+        flush_outbox.delay(countdown=countdown)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Сохраняет письма в таблицу исходящих вместо отправки в запросе.
+
+    Отправкой занимается задача flush_outbox в воркере run_tasks.
+    """
+
+    def send_messages(self, email_messages):
+        OutboxMessage.objects.bulk_create(
+            OutboxMessage(message=json.dumps(
+                serialize_message(message), ensure_ascii=False
+            ))
+            for message in email_messages
+        )
+        if email_messages:
+            schedule_flush()
+        return len(email_messages)
@@ -0,0 +1,38 @@
+import time
+from statistics import median
+
+from django.core.management.base import BaseCommand
+
+from core.ratelimit import hit
+
+
+class Command(BaseCommand):
+    help = 'Измеряет, сколько стоит проверка предела частоты запросов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=10000,
+            help='Сколько проверок выполнить.'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=100,
+            help='Между сколькими клиентами распределить проверки.'
+        )
+
+    def handle(self, *args, **options):
+        timings = []
+        for number in range(options['repeat']):
+            client = f'benchmark:{number % options["clients"]}'
+            started = time.perf_counter()
+            hit('benchmark', client, options['repeat'], 60)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        message = (
+            f'Проверка: медиана {median(timings):.1f} мкс, '
+            f'99% {p99:.1f} мкс'
+        )
+        if p99 < 1000:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.WARNING(f'{message} — больше 1 мс'))
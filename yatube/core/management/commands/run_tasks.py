@@ -0,0 +1,82 @@
+import logging
+import time
+from multiprocessing import Process
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.tasks import run_pending
+
+logger = logging.getLogger(__name__)
+
+
+def work(poll):
+    """Цикл воркера: выполняет задачи, а когда их нет — ждёт poll секунд.
+
+    Ошибка самой очереди, например потерянное соединение с базой,
+    не убивает воркер: соединение закрывается, и после паузы он
+    пробует снова.
+    """
+    while True:
+        try:
+            done, failed = run_pending()
+        except Exception:
+            logger.exception('Очередь задач недоступна')
+            close_old_connections()
+            done = failed = 0
+        if not done and not failed:
+            time.sleep(poll)
+
+
+def start_worker(poll):
+    worker = Process(target=work, args=(poll,), daemon=True)
+    worker.start()
+    return worker
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_WORKERS,
+            help='Сколько процессов выполняют задачи.'
+        )
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Как часто проверять очередь, если она пуста, в секундах.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи в этом процессе и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            done, failed = run_pending()
+            self.stdout.write(self.style.SUCCESS(
+                f'Выполнено задач: {done}, упало: {failed}'
+            ))
+            return
+        # Соединения с базой не должны достаться дочерним процессам.
+        connections.close_all()
+        poll = options['poll']
+        workers = [
+            start_worker(poll) for _ in range(max(1, options['workers']))
+        ]
+        self.stdout.write(f'Запущено воркеров: {len(workers)}')
+        try:
+            while True:
+                # Упавший процесс заменяется новым.
+                for number, worker in enumerate(workers):
+                    if not worker.is_alive():
+                        self.stderr.write(
+                            f'Воркер {worker.pid} завершился с кодом '
+                            f'{worker.exitcode}, запускаем новый'
+                        )
+                        workers[number] = start_worker(poll)
+                time.sleep(max(poll, 1))
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from core.compression import (choose_encoding, compress, compress_stream,
+                              is_compressible)
+
+
+class CompressionMiddleware:
+    """Сжимает ответы gzip или deflate, в том числе потоковые.
+
+    brotli используется, только если установлен необязательный пакет.
+
+    Если страница пометила ответ ключом compressed_cache_key, сжатые байты
+    кладутся в кэш, и следующие запросы отдают их без повторного сжатия.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+            cache_key = getattr(response, 'compressed_cache_key', None)
+            if cache_key is not None:
+                cache.set(
+                    f'{cache_key}:{encoding}', content,
+                    settings.PAGE_CACHE_TIMEOUT
+                )
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
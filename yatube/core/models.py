@@ -0,0 +1,127 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class StoredFile(models.Model):
+    """Файл в хранилище по хэшу и число ссылающихся на него записей."""
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+    size = models.PositiveIntegerField('Размер')
+    refs = models.PositiveIntegerField('Ссылок', default=1)
+    created = models.DateTimeField('Загружен', auto_now_add=True)
+
+    @classmethod
+    def acquire(cls, name, size):
+        """Добавляет ссылку на файл, держа блокировку строки до коммита.
+
+        Пока она держится, параллельный release() не удалит файл, который
+        вызывающий код сейчас проверяет или записывает.
+        """
+        stored = cls.objects.select_for_update().filter(name=name).first()
+        if stored is None:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(name=name, size=size)
+                return
+            except IntegrityError:
+                # Строку только что создал параллельный запрос.
+                cls.objects.select_for_update().get(name=name)
+        cls.objects.filter(name=name).update(refs=F('refs') + 1)
+
+    @classmethod
+    def release(cls, name):
+        """Снимает ссылку; True, если она была последней.
+
+        Вызывается в транзакции: файл удаляют до её коммита, под той же
+        блокировкой строки.
+        """
+        stored = cls.objects.select_for_update().filter(name=name).first()
+        if stored is None:
+            return False
+        if stored.refs > 1:
+            cls.objects.filter(name=name).update(refs=F('refs') - 1)
+            return False
+        stored.delete()
+        return True
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, помеченной core.tasks.task."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=255)
+    args = models.TextField('Аргументы в JSON', default='[]')
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    run_at = models.DateTimeField('Выполнить не раньше', default=timezone.now)
+    locked_until = models.DateTimeField(
+        'Занята воркером до', null=True, blank=True
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Предел попыток', default=5
+    )
+    error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        ordering = ('-priority', 'run_at', 'pk')
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='task_queue_idx',
+            ),
+        ]
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name}{self.args}'
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ждущее отправки воркером очереди."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ждёт отправки'),
+        (SENDING, 'Отправляется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    message = models.TextField('Письмо в JSON')
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=PENDING
+    )
+    send_after = models.DateTimeField(
+        'Отправить не раньше', default=timezone.now
+    )
+    locked_until = models.DateTimeField(
+        'Занято воркером до', null=True, blank=True
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ('send_after', 'pk')
+        indexes = [
+            models.Index(
+                fields=['status', 'send_after'], name='outbox_queue_idx'
+            ),
+        ]
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'Письмо {self.pk}'
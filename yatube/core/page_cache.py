@@ -0,0 +1,87 @@
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from core.compression import choose_encoding
+from core.esi import render_holes
+
+VERSION_KEY = 'page_cache_version'
+
+
+def page_cache_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, int(time.time()), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_page_cache():
+    """Сбрасывает все закэшированные страницы сменой версии ключей."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        page_cache_version()
+
+
+def page_cache_key(request):
+    path = md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{page_cache_version()}:{path}'
+
+
+def cache_page_with_holes(view):
+    """Кэширует страницу одну на всех пользователей.
+
+    Персональные части шаблона, выведенные тегом {% esi %}, попадают в кэш
+    метками и дорисовываются для каждого запроса отдельно. Для анонимов
+    фрагменты одинаковы, поэтому CompressionMiddleware кэширует готовую
+    сжатую страницу, и повторные анонимные запросы отдаются из кэша как есть.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+        key = page_cache_key(request)
+        anonymous_key = None
+        if not request.user.is_authenticated:
+            anonymous_key = f'{key}:anonymous'
+            response = cached_compressed_response(request, anonymous_key)
+            if response is not None:
+                return response
+        content = cache.get(key)
+        if content is not None:
+            response = HttpResponse(render_holes(request, content))
+            response.compressed_cache_key = anonymous_key
+            return response
+        request.esi_deferred = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            request.esi_deferred = False
+        if response.streaming:
+            return response
+        if response.status_code == 200:
+            cache.set(key, response.content, settings.PAGE_CACHE_TIMEOUT)
+            response.compressed_cache_key = anonymous_key
+        response.content = render_holes(request, response.content)
+        return response
+    return wrapper
+
+
+def cached_compressed_response(request, key):
+    encoding = choose_encoding(request)
+    if encoding is None:
+        return None
+    content = cache.get(f'{key}:{encoding}')
+    if content is None:
+        return None
+    response = HttpResponse(content)
+    response['Content-Encoding'] = encoding
+    response['Content-Length'] = str(len(content))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
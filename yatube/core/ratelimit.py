@@ -0,0 +1,99 @@
+import math
+import time
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'10/m' — (10, 60): число запросов и период в секундах.
+
+    Неверная строка даёт ValueError; настройки проверяет core.checks.
+    """
+    count, _, period = str(rate).partition('/')
+    if not count.isdigit() or period not in PERIODS:
+        raise ValueError(
+            f'Неверный предел {rate!r}: нужно вида 10/m, период одно из '
+            f'{", ".join(PERIODS)}.'
+        )
+    return int(count), PERIODS[period]
+
+
+def client_key(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def hit(scope, client, limit, period):
+    """Засчитывает запрос; возвращает, сколько секунд ждать, или 0.
+
+    Вместо token bucket сознательно взято скользящее окно: корзине
+    нужно без гонок читать и писать пару «токены, время», а окну
+    хватает атомарных incr и decr по счётчикам. Окно из двух соседних
+    периодов: к счётчику текущего добавляется счётчик прошлого с весом,
+    равным доле прошлого периода, ещё попадающей в окно. Так на стыке
+    периодов нельзя сделать 2 * limit запросов подряд. Проверка стоит
+    три-четыре обращения к кэшу и не трогает базу. Отклонённый запрос
+    не засчитывается: иначе клиент, выждавший Retry-After, снова упёрся
+    бы в предел.
+    """
+    now = time.time()
+    window, elapsed = divmod(now, period)
+    key = f'ratelimit:{scope}:{client}:{int(window)}'
+    previous = cache.get(f'ratelimit:{scope}:{client}:{int(window) - 1}', 0)
+    # Счётчик нужен и в следующем периоде, уже как прошлый.
+    cache.add(key, 0, 2 * period)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Ключ вытеснили между add и incr.
+        cache.set(key, 1, 2 * period)
+        count = 1
+    weight = 1 - elapsed / period
+    if previous * weight + count <= limit:
+        return 0
+    try:
+        cache.decr(key)
+    except ValueError:
+        pass
+    if count <= limit:
+        # Ждём, пока вес прошлого периода не опустится достаточно.
+        wait = period * (1 - (limit - count) / previous) - elapsed
+    else:
+        # Текущий период сам превысил предел: ждём, пока он станет
+        # прошлым и его вес упадёт.
+        wait = period - elapsed + period * (1 - limit / count)
+    return max(1, math.ceil(wait))
+
+
+def ratelimit(scope, methods=None):
+    """Ограничивает частоту запросов к представлению.
+
+    Предел берётся из settings.RATE_LIMITS[scope] и считается отдельно
+    для каждого пользователя, а для анонимов — для каждого IP. methods
+    ограничивает проверку, например, только POST-запросами.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rate = settings.RATE_LIMITS.get(scope)
+            if rate and (methods is None or request.method in methods):
+                limit, period = parse_rate(rate)
+                retry_after = hit(scope, client_key(request), limit, period)
+                if retry_after:
+                    response = render(
+                        request, 'core/429.html',
+                        {'retry_after': retry_after},
+                        status=HTTPStatus.TOO_MANY_REQUESTS,
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import posixpath
+import re
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+from core.models import StoredFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def gzip_compress(data):
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as archive:
+        archive.write(data)
+    return buffer.getvalue()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэширует имена статики и кладёт рядом сжатые копии.
+
+    .gz пишется всегда, .br — только если установлен необязательный
+    пакет brotli.
+    """
+    compressible_extensions = (
+        '.css', '.js', '.svg', '.ico', '.txt', '.json', '.xml', '.html',
+        '.map',
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(self.compressible_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        encoders = [('.gz', gzip_compress)]
+        if brotli is not None:
+            encoders.append(('.br', brotli.compress))
+        for suffix, encode in encoders:
+            compressed = encode(data)
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем из sha256 содержимого.
+
+    posts/photo.jpg превращается в posts/ab/cd/abcd….jpg: каталоги по
+    префиксам хэша не дают одной папке разрастись, а одинаковые загрузки
+    лежат на диске один раз. Сколько записей ссылается на файл, считает
+    модель StoredFile; delete() удаляет файл только вместе с последней
+    ссылкой и не трогает файлы, сохранённые до перехода на это хранилище.
+    """
+    shard_depth = 2
+    shard_width = 2
+    hashed_name_re = re.compile(
+        r'(^|/)([0-9a-f]{2}/){2}[0-9a-f]{64}(\.\w+)?$'
+    )
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        shards = [
+            hexdigest[start:start + self.shard_width]
+            for start in range(
+                0, self.shard_depth * self.shard_width, self.shard_width
+            )
+        ]
+        return posixpath.join(directory, *shards, hexdigest + extension)
+
+    def is_hashed(self, name):
+        return bool(self.hashed_name_re.search(name))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        # Проверка наличия файла и запись идут под блокировкой строки
+        # StoredFile: так delete() не удалит файл, который мы сочли
+        # существующим.
+        with transaction.atomic():
+            StoredFile.acquire(name, content.size)
+            if not self.exists(name):
+                try:
+                    self._save(name, content)
+                except FileExistsError:
+                    # Тот же файл только что сохранил параллельный запрос.
+                    pass
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым: занятое имя значит, что такой файл
+        # уже есть, и подбирать другое нельзя.
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def delete(self, name):
+        with transaction.atomic():
+            if StoredFile.release(name):
+                super().delete(name)
+
+    def remove(self, name):
+        """Удаляет файл с диска, не глядя на счётчик ссылок."""
+        super().delete(name)
@@ -0,0 +1,191 @@
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+# Задача, которую сейчас выполняет этот воркер: её продлевает heartbeat().
+current = threading.local()
+
+
+class LeaseLost(Exception):
+    """Блокировка истекла, и задачу уже взял другой воркер."""
+
+
+def task(priority=0, max_attempts=5):
+    """Помечает функцию как задачу очереди.
+
+    func.delay(*args) кладёт вызов в таблицу задач, и его выполнит
+    воркер run_tasks. Аргументы должны сериализоваться в JSON. Запись
+    создаётся в текущей транзакции: откат отменяет и задачу.
+
+    Доставка «хотя бы один раз»: задачу, которая упала вместе с воркером
+    или не продлевала блокировку дольше TASK_TIMEOUT, другой воркер сочтёт
+    брошенной и запустит снова, так что повтор не должен ничего ломать.
+    Задача, которая может работать дольше TASK_TIMEOUT, обязана по ходу
+    работы вызывать heartbeat(); из задач проекта так делает только
+    posts.tasks.build_archive, остальные укладываются в TASK_TIMEOUT.
+    """
+    def decorator(func):
+        name = task_name(func)
+
+        def delay(*args, countdown=0, priority=priority,
+                  max_attempts=max_attempts):
+            return Task.objects.create(
+                name=name,
+                args=json.dumps(args, ensure_ascii=False),
+                priority=priority,
+                max_attempts=max_attempts,
+                run_at=timezone.now() + timedelta(seconds=countdown),
+            )
+
+        func.delay = delay
+        func.is_task = True
+        return func
+    return decorator
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__name__}'
+
+
+def is_queued(func, *args):
+    """Ждёт ли уже такой вызов в очереди или выполняется прямо сейчас."""
+    return Task.objects.filter(
+        name=task_name(func),
+        args=json.dumps(args, ensure_ascii=False),
+        status__in=(Task.QUEUED, Task.RUNNING),
+    ).exists()
+
+
+def ready(now):
+    return (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        # Задача воркера, который умер, не закончив её.
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(batch=10):
+    """Берёт следующую задачу с наибольшим приоритетом.
+
+    Условный UPDATE по статусу не даёт двум воркерам взять одну задачу:
+    проигравший просто пробует следующую.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(ready(now)).values_list(
+        'pk', flat=True
+    )[:batch]
+    for pk in candidates:
+        if Task.objects.filter(ready(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=now + timedelta(seconds=settings.TASK_TIMEOUT),
+            attempts=F('attempts') + 1,
+        ):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    """Пауза перед повтором: растёт вдвое с каждой попыткой."""
+    return min(
+        settings.TASK_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.TASK_MAX_RETRY_DELAY,
+    )
+
+
+def current_task():
+    """Задача, которую сейчас выполняет этот воркер, или None."""
+    return getattr(current, 'job', None)
+
+
+def heartbeat():
+    """Продлевает блокировку выполняемой задачи на TASK_TIMEOUT.
+
+    Долгая задача вызывает её по ходу работы, сколь угодно часто: в базу
+    продление пишется, только когда от блокировки осталось меньше двух
+    третей. Если задачу уже взял другой воркер, бросает LeaseLost, чтобы
+    она не шла дальше параллельно с ним. Вне задачи ничего не делает.
+    """
+    job = current_task()
+    if job is None:
+        return
+    now = timezone.now()
+    lease = timedelta(seconds=settings.TASK_TIMEOUT)
+    if job.locked_until - now > lease * 2 / 3:
+        return
+    if not Task.objects.filter(
+        pk=job.pk, locked_until=job.locked_until
+    ).update(locked_until=now + lease):
+        raise LeaseLost(str(job))
+    job.locked_until = now + lease
+
+
+def claimed(job):
+    # Блокировка могла продлиться через heartbeat(), поэтому берётся
+    # с объекта задачи в момент записи итога.
+    return Task.objects.filter(pk=job.pk, locked_until=job.locked_until)
+
+
+def execute(job):
+    """Выполняет задачу: удачную удаляет, упавшую откладывает на повтор.
+
+    Итог записывается, только если задача всё ещё за этим воркером:
+    когда блокировка истекла и задачу взял другой, его запись главнее.
+    Возвращает True, если задача выполнена.
+    """
+    current.job = job
+    try:
+        func = import_string(job.name)
+        if not getattr(func, 'is_task', False):
+            raise ImportError(f'{job.name} не помечена как задача')
+        func(*json.loads(job.args))
+    except LeaseLost:
+        logger.warning('Задачу %s уже взял другой воркер', job)
+        return False
+    except Exception as error:
+        logger.exception('Задача %s упала', job)
+        job.error = f'{type(error).__name__}: {error}'
+        if job.attempts >= job.max_attempts:
+            job.status = Task.FAILED
+        else:
+            job.status = Task.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts)
+            )
+        if not claimed(job).update(
+            error=job.error, status=job.status, run_at=job.run_at,
+            locked_until=None,
+        ):
+            logger.warning('Задачу %s уже взял другой воркер', job)
+        return False
+    finally:
+        current.job = None
+    if not claimed(job).delete()[0]:
+        logger.warning('Задачу %s уже взял другой воркер', job)
+    return True
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока они есть.
+
+    Возвращает число выполненных и упавших задач.
+    """
+    done = failed = 0
+    while limit is None or done + failed < limit:
+        job = claim()
+        if job is None:
+            break
+        if execute(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.esi import include_tag, render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def esi(context, name, **params):
+    """Персональный фрагмент: метка в кэшируемой странице, иначе сразу html."""
+    request = context.get('request')
+    params = {key: str(value) for key, value in params.items()}
+    if getattr(request, 'esi_deferred', False):
+        return mark_safe(include_tag(name, params))
+    return mark_safe(render_fragment(request, name, params))
@@ -0,0 +1,154 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.mail import claim, failed, flush_outbox
+from core.models import OutboxMessage, Task
+from core.tasks import run_pending
+
+
+class CountingBackend(EmailBackend):
+    """locmem, который считает открытые соединения и роняет письма 'сбой'."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        if any(message.subject == 'сбой' for message in messages):
+            raise ConnectionError('сервер недоступен')
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('сервер недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='core.test_mail.CountingBackend',
+    EMAIL_RATE_LIMIT=0,
+)
+class OutboxTest(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def send(self, *subjects):
+        for subject in subjects:
+            mail.send_mail(subject, 'Текст', 'from@example.com', ['to@x.ru'])
+
+    def test_messages_sent_over_one_connection(self):
+        """Письма ждут воркера и уходят через одно соединение."""
+        self.send('Первое', 'Второе', 'Третье')
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(
+            [message.subject for message in mail.outbox],
+            ['Первое', 'Второе', 'Третье'],
+        )
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failed_message_retried_later(self):
+        """Неотправленное письмо откладывается, остальные уходят."""
+        self.send('сбой', 'Обычное')
+        with self.assertLogs('core.mail', 'ERROR'):
+            run_pending()
+        self.assertEqual([m.subject for m in mail.outbox], ['Обычное'])
+        outbox = OutboxMessage.objects.get()
+        self.assertEqual(
+            (outbox.status, outbox.attempts), (OutboxMessage.PENDING, 1)
+        )
+        self.assertIn('сервер недоступен', outbox.error)
+
+    @override_settings(EMAIL_RATE_LIMIT=2)
+    def test_rate_limit(self):
+        self.send('Первое', 'Второе')
+        with mock.patch('core.mail.time.sleep') as sleep:
+            run_pending()
+        self.assertEqual(sleep.call_count, 2)
+        self.assertAlmostEqual(sleep.call_args[0][0], 0.5, places=1)
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND='core.test_mail.UnreachableBackend',
+        TASK_RETRY_DELAY=30,
+    )
+    def test_unreachable_server_rescheduled(self):
+        """Недоступный сервер не тратит попытки, а отправка повторится."""
+        self.send('Письмо')
+        started = timezone.now()
+        with self.assertLogs('core.mail', 'ERROR'):
+            self.assertEqual(run_pending(), (1, 0))
+        outbox = OutboxMessage.objects.get()
+        self.assertEqual(
+            (outbox.status, outbox.attempts), (OutboxMessage.PENDING, 0)
+        )
+        self.assertGreaterEqual(
+            Task.objects.get().run_at, started + timedelta(seconds=30)
+        )
+
+    def test_abandoned_message_rescheduled(self):
+        """Письмо упавшего воркера подхватывается после его блокировки."""
+        locked_until = timezone.now() + timedelta(minutes=5)
+        OutboxMessage.objects.create(
+            message='{}', status=OutboxMessage.SENDING,
+            locked_until=locked_until,
+        )
+        flush_outbox()
+        self.assertAlmostEqual(
+            Task.objects.get().run_at, locked_until,
+            delta=timedelta(seconds=1),
+        )
+
+    def test_result_scoped_to_claim(self):
+        """Воркер с истёкшей блокировкой не трогает чужое письмо."""
+        self.send('Письмо')
+        outbox = claim(timezone.now())
+        taken = timezone.now() + timedelta(hours=1)
+        OutboxMessage.objects.update(locked_until=taken)
+        with self.assertLogs('core.mail', 'WARNING'):
+            failed(outbox, ConnectionError('сбой'))
+        outbox.refresh_from_db()
+        self.assertEqual(
+            (outbox.status, outbox.attempts, outbox.locked_until),
+            (OutboxMessage.SENDING, 0, taken),
+        )
+
+    def test_one_flush_queued(self):
+        """Новые письма не плодят задачи: отложенная отправка приближается."""
+        flush_outbox.delay(countdown=60)
+        self.send('Первое', 'Второе')
+        task = Task.objects.get()
+        self.assertLessEqual(task.run_at, timezone.now())
+
+    @override_settings(TASK_RETRY_DELAY=30)
+    def test_one_flusher_at_a_time(self):
+        """Пока письма отправляет другой воркер, задача откладывается."""
+        Task.objects.create(
+            name='core.mail.flush_outbox', status=Task.RUNNING,
+            locked_until=timezone.now() + timedelta(minutes=5),
+        )
+        self.send('Письмо')
+        run_pending()
+        self.assertEqual(mail.outbox, [])
+        queued = Task.objects.get(status=Task.QUEUED)
+        self.assertGreater(
+            queued.run_at, timezone.now() + timedelta(seconds=20)
+        )
+
+    @override_settings(EMAIL_BATCH_SIZE=2)
+    def test_flush_bounded_and_requeued(self):
+        """За запуск уходит не больше EMAIL_BATCH_SIZE писем."""
+        self.send('Первое', 'Второе', 'Третье')
+        self.assertEqual(run_pending(limit=1), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(Task.objects.count(), 1)
+        run_pending()
+        self.assertEqual(len(mail.outbox), 3)
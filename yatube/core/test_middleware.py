@@ -0,0 +1,55 @@
+import gzip
+import zlib
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.middleware import CompressionMiddleware
+
+
+class CompressionMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_page_is_compressed(self):
+        """Страница сжимается gzip, если клиент его принимает."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('Yatube', gzip.decompress(response.content).decode())
+
+    def test_small_body_is_not_compressed(self):
+        """Короткие ответы отдаются как есть."""
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda request: HttpResponse('ok'))
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed(self):
+        """Потоковый ответ сжимается по кускам."""
+        chunks = [b'x' * 1000, b'y' * 1000]
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='deflate')
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter(chunks))
+        )
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'deflate')
+        self.assertEqual(
+            zlib.decompress(b''.join(response.streaming_content)),
+            b''.join(chunks)
+        )
+
+    def test_anonymous_page_cache_hit_skips_compression(self):
+        """Повторный анонимный запрос отдаёт уже сжатые байты из кэша."""
+        url = reverse('posts:index')
+        first = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch('core.middleware.compress') as compress:
+            second = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second['Content-Encoding'], 'gzip')
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.checks import check_rate_limits
+from core.ratelimit import hit
+
+User = get_user_model()
+
+
+@override_settings(RATE_LIMITS={'follow': '2/m', 'post_create': '1/h'})
+class RateLimitTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.follow_url = reverse('posts:profile_follow', args=('author',))
+
+    @mock.patch('core.ratelimit.time.time', return_value=60 * 1000 + 30)
+    def test_limit_exceeded(self, _):
+        """Сверх предела запрос получает 429 и Retry-After."""
+        for _ in range(2):
+            response = self.client.get(self.follow_url)
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.get(self.follow_url)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        # Три запроса за период: через 30 с он станет прошлым, и ещё
+        # через 20 с его вес опустится до двух запросов.
+        self.assertEqual(response['Retry-After'], '50')
+
+    def test_window_slides_over_period_boundary(self):
+        """На стыке периодов запас не выдаётся заново целиком."""
+        with mock.patch('core.ratelimit.time.time', return_value=119):
+            self.assertEqual(hit('test', 'client', 2, 60), 0)
+            self.assertEqual(hit('test', 'client', 2, 60), 0)
+        with mock.patch('core.ratelimit.time.time', return_value=121):
+            self.assertEqual(hit('test', 'client', 2, 60), 29)
+        with mock.patch('core.ratelimit.time.time', return_value=150):
+            self.assertEqual(hit('test', 'client', 2, 60), 0)
+
+    def test_limit_per_user(self):
+        for _ in range(2):
+            self.client.get(self.follow_url)
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=('auth',))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_only_listed_methods_counted(self):
+        """Показ формы не тратит предел на создание постов."""
+        url = reverse('posts:post_create')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+        self.client.post(url, {'text': 'Первый пост'})
+        response = self.client.post(url, {'text': 'Второй пост'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_invalid_rate_fails_check(self):
+        """Опечатка в RATE_LIMITS видна при запуске, а не как 500."""
+        self.assertEqual(check_rate_limits(None), [])
+        with self.settings(RATE_LIMITS={'follow': '2/min', 'x': 'ten/m'}):
+            errors = check_rate_limits(None)
+        self.assertEqual(
+            [error.id for error in errors], ['core.E001', 'core.E001']
+        )
+        self.assertIn("RATE_LIMITS['follow']", errors[0].msg)
@@ -0,0 +1,42 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.storage = ContentAddressedStorage()
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые файлы получают одно имя и общий счётчик ссылок."""
+        first = self.storage.save('posts/a.JPG', ContentFile(b'photo'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'photo'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^posts/\w\w/\w\w/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(StoredFile.objects.get(name=first).refs, 2)
+        other = self.storage.save('posts/a.jpg', ContentFile(b'other'))
+        self.assertNotEqual(first, other)
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется с диска только вместе с последней ссылкой."""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.management.commands.run_tasks import work
+from core.models import Task
+from core.tasks import claim, execute, heartbeat, run_pending, task
+
+calls = []
+
+
+@task()
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def broken():
+    raise RuntimeError('сломано')
+
+
+@task()
+def long_running():
+    # Через 250 с от блокировки на 300 с остаётся меньше двух третей.
+    later = timezone.now() + timedelta(seconds=250)
+    with mock.patch('core.tasks.timezone.now', return_value=later):
+        heartbeat()
+    calls.append(Task.objects.get().locked_until - later)
+
+
+@task()
+def taken_over():
+    # Блокировка истекла, и задачу взял другой воркер.
+    Task.objects.update(locked_until=timezone.now() + timedelta(hours=1))
+    later = timezone.now() + timedelta(seconds=350)
+    with mock.patch('core.tasks.timezone.now', return_value=later):
+        heartbeat()
+    calls.append('продолжила')
+
+
+@override_settings(TASK_RETRY_DELAY=10, TASK_MAX_RETRY_DELAY=60)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_tasks_run_by_priority(self):
+        """Задачи выполняются по убыванию приоритета и удаляются."""
+        remember.delay('обычная')
+        remember.delay('срочная', priority=5)
+        remember.delay('отложенная', countdown=60)
+        self.assertEqual(run_pending(), (2, 0))
+        self.assertEqual(calls, ['срочная', 'обычная'])
+        self.assertEqual(Task.objects.get().args, '["отложенная"]')
+
+    def test_failed_task_retried_with_backoff(self):
+        """Упавшая задача откладывается, а после предела попыток — ошибка."""
+        job = broken.delay()
+        started = timezone.now()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.QUEUED, 1))
+        self.assertIn('RuntimeError: сломано', job.error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        self.assertEqual(run_pending(), (0, 0))
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_abandoned_task_reclaimed(self):
+        """Задачу умершего воркера берёт другой, когда истекла блокировка."""
+        job = remember.delay('снова')
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.RUNNING,
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(calls, ['снова'])
+
+    def test_reclaimed_task_left_to_new_worker(self):
+        """Воркер с истёкшей блокировкой не удаляет чужую задачу."""
+        remember.delay('дважды')
+        job = claim()
+        Task.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() + timedelta(hours=1)
+        )
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertTrue(execute(job))
+        self.assertTrue(Task.objects.filter(pk=job.pk).exists())
+
+    @override_settings(TASK_TIMEOUT=300)
+    def test_heartbeat_renews_lease(self):
+        """Долгая задача продлевает блокировку и завершается как обычно."""
+        long_running.delay()
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(calls, [timedelta(seconds=300)])
+        self.assertFalse(Task.objects.exists())
+
+    def test_heartbeat_stops_task_taken_over(self):
+        """Задача, которую взял другой воркер, не идёт дальше."""
+        taken_over.delay()
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        self.assertEqual(calls, [])
+        self.assertEqual(Task.objects.get().status, Task.RUNNING)
+
+    def test_worker_survives_queue_errors(self):
+        """Ошибка базы в цикле воркера логируется, и цикл продолжается."""
+        errors = [OperationalError('нет соединения'), KeyboardInterrupt]
+        with mock.patch(
+            'core.management.commands.run_tasks.run_pending',
+            side_effect=errors,
+        ), mock.patch('core.management.commands.run_tasks.time.sleep'):
+            with self.assertLogs('core.management.commands.run_tasks'):
+                with self.assertRaises(KeyboardInterrupt):
+                    work(poll=0)
+
+    def test_unmarked_function_not_run(self):
+        Task.objects.create(name='os.getcwd', max_attempts=1)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(run_pending(), (0, 1))
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
@@ -1,6 +1,18 @@
+import os
+import shutil
+import tempfile
 from http import HTTPStatus
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.middleware import CompressionMiddleware
+from core.views import media_file
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class ViewTestClass(TestCase):
@@ -10,3 +22,134 @@ class ViewTestClass(TestCase):
             response.status_code,
             HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage',
+)
+class StaticFilesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def test_collectstatic_precompresses_hashed_files(self):
+        """collectstatic создаёт хэшированные имена и .gz копии."""
+        name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        self.assertNotEqual(name, 'css/bootstrap.min.css')
+        self.assertTrue(
+            os.path.isfile(os.path.join(TEMP_STATIC_ROOT, name + '.gz'))
+        )
+
+    def test_static_file_picks_encoding(self):
+        """Сжатая копия выбирается по Accept-Encoding и кэшируется."""
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        not_modified = self.client.get(
+            url, HTTP_IF_NONE_MATCH=plain['ETag']
+        )
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_static_file_respects_zero_quality(self):
+        """Кодировка с q=0 не выбирается."""
+        url = staticfiles_storage.url('css/bootstrap.min.css')
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0, identity'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0.5'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaFilesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'), 'wb') as f:
+            f.write(bytes(range(100)))
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.svg'), 'wb') as f:
+            f.write(b'<svg xmlns="http://www.w3.org/2000/svg"/>' * 10)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        request = self.factory.get('/media/posts/a.jpg', **headers)
+        return media_file(request, 'posts/a.jpg')
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с валидаторами кэша."""
+        response = self.get()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response), bytes(range(100)))
+        not_modified = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_byte_ranges(self):
+        """Заголовок Range отдаёт только запрошенные байты."""
+        ranges = {
+            'bytes=10-19': (bytes(range(10, 20)), 'bytes 10-19/100'),
+            'bytes=90-': (bytes(range(90, 100)), 'bytes 90-99/100'),
+            'bytes=-5': (bytes(range(95, 100)), 'bytes 95-99/100'),
+        }
+        for header, (content, content_range) in ranges.items():
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT
+                )
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(b''.join(response), content)
+
+    def test_unsatisfiable_and_stale_ranges(self):
+        """Невыполнимый диапазон даёт 416, устаревший If-Range весь файл."""
+        response = self.get(HTTP_RANGE='bytes=200-')
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_ranges_not_compressed(self):
+        """Диапазон сжимаемого файла отдаётся как есть, без gzip."""
+        middleware = CompressionMiddleware(
+            lambda request: media_file(request, 'posts/a.svg')
+        )
+        request = self.factory.get(
+            '/media/posts/a.svg',
+            HTTP_RANGE='bytes=0-9', HTTP_ACCEPT_ENCODING='gzip',
+        )
+        response = middleware(request)
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response), b'<svg xmlns')
+
+    @override_settings(SENDFILE_HEADER='X-Accel-Redirect')
+    def test_proxy_offload(self):
+        """С настроенным прокси тело файла не читается."""
+        response = self.get()
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/a.jpg'
+        )
+        self.assertEqual(response.content, b'')
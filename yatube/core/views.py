@@ -1,6 +1,14 @@
+import re
 from http import HTTPStatus
 
+from django.conf import settings
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.encoding import escape_uri_path
+
+from core.files import serve_file
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
 
 
 def page_not_found(request, exception):
@@ -23,3 +31,25 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=HTTPStatus.FORBIDDEN)
+
+
+def static_file(request, path):
+    """Статика с хэшем в имени кэшируется браузером навсегда."""
+    fullpath = safe_join(settings.STATIC_ROOT, path)
+    if HASHED_NAME_RE.search(path):
+        cache_control = f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+    else:
+        cache_control = 'public, max-age=0, must-revalidate'
+    return serve_file(request, fullpath, cache_control, precompressed=True)
+
+
+def media_file(request, path):
+    """Загруженные картинки и миниатюры, при возможности через прокси."""
+    fullpath = safe_join(settings.MEDIA_ROOT, path)
+    offload = fullpath
+    if settings.SENDFILE_HEADER == 'X-Accel-Redirect':
+        offload = settings.SENDFILE_URL + escape_uri_path(path)
+    return serve_file(
+        request, fullpath, f'public, max-age={settings.MEDIA_MAX_AGE}',
+        offload=offload,
+    )
@@ -1,6 +1,16 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
 
-from .models import Group, Post, Comment, Follow
+from .deletion import (
+    claimable, schedule_post_deletion, schedule_user_deletion
+)
+from .models import Group, Post, Comment, DeletionJob, Follow
+
+User = get_user_model()
 
 
 @admin.register(Post)
@@ -16,8 +26,78 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    actions = ('delete_in_background',)
+
+    def delete_in_background(self, request, queryset):
+        count = sum(
+            schedule_post_deletion(post) is not None for post in queryset
+        )
+        messages.success(
+            request, f'Поставлено в очередь на удаление: {count}.'
+        )
+    delete_in_background.short_description = 'Удалить в фоне'
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        '__str__',
+        'status',
+        'progress_display',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind', 'object_id', 'label', 'status', 'total', 'deleted',
+        'error', 'locked_until', 'created', 'finished',
+    )
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress_display(self, job):
+        return f'{job.deleted} из {job.total} ({job.progress}%)'
+    progress_display.short_description = 'Прогресс'
+
+    def retry(self, request, queryset):
+        # Упавшее или брошенное задание продолжит с оставшихся записей;
+        # задание, которое воркер ещё выполняет, не трогаем.
+        retryable = claimable(timezone.now()) | Q(status=DeletionJob.FAILED)
+        count = 0
+        for job in queryset.filter(retryable):
+            try:
+                with transaction.atomic():
+                    count += DeletionJob.objects.filter(
+                        retryable, pk=job.pk
+                    ).update(
+                        status=DeletionJob.PENDING, error='',
+                        locked_until=None
+                    )
+            except IntegrityError:
+                # На этот объект уже стоит в очереди другое задание.
+                continue
+        messages.success(request, f'Перезапущено заданий: {count}.')
+    retry.short_description = 'Перезапустить'
+
+
+class DeletingUserAdmin(UserAdmin):
+    actions = ('delete_in_background',)
+
+    def delete_in_background(self, request, queryset):
+        count = sum(
+            schedule_user_deletion(user) is not None for user in queryset
+        )
+        messages.success(
+            request,
+            f'Пользователи скрыты, в очередь на удаление поставлено: {count}.'
+        )
+    delete_in_background.short_description = 'Удалить в фоне'
 
 
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.unregister(User)
+admin.site.register(User, DeletingUserAdmin)
@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+
+from posts.exports import EXPORTS, export_rows, isoformat, write_ndjson
+from posts.models import Post
+
+# По сколько байт копировать картинки в архив.
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class ZipStream:
+    """Файл для ZipFile, который копит записанное до следующего pop().
+
+    Без seek() и tell() ZipFile пишет размеры и CRC после данных, так
+    что архив можно отдавать по мере сборки.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def entry(name, compress_type=zipfile.ZIP_DEFLATED):
+    info = zipfile.ZipInfo(name, timezone.localtime().timetuple()[:6])
+    info.compress_type = compress_type
+    return info
+
+
+def user_archive(user, chunk_size=500):
+    """Zip с профилем, постами, комментариями и картинками пользователя.
+
+    Генератор отдаёт архив кусками: строки читаются из базы порциями по
+    chunk_size, картинки копируются блоками по COPY_CHUNK_SIZE, и в памяти
+    никогда не лежит больше одной порции.
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(entry('profile.json'), 'w') as file:
+            file.write(json.dumps({
+                'username': user.username,
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+                'email': user.email,
+                'date_joined': user.date_joined,
+            }, ensure_ascii=False, default=isoformat).encode())
+        yield stream.pop()
+        for name, queryset in (
+            ('posts', user.posts.all()),
+            ('comments', user.comments.all()),
+        ):
+            _, fields, _ = EXPORTS[name]
+            rows = export_rows(name, queryset, chunk_size=chunk_size)
+            with io.TextIOWrapper(
+                archive.open(entry(f'{name}.ndjson'), 'w', force_zip64=True),
+                encoding='utf-8', write_through=True,
+            ) as file:
+                while write_ndjson(file, fields, islice(rows, chunk_size)):
+                    yield stream.pop()
+            yield stream.pop()
+        for name in image_names(user):
+            yield from copy_image(archive, stream, name)
+    yield stream.pop()
+
+
+def image_names(user):
+    return user.posts.exclude(image='').order_by().values_list(
+        'image', flat=True
+    ).distinct().iterator()
+
+
+def copy_image(archive, stream, name):
+    """Копирует картинку в архив как есть: JPEG и PNG уже сжаты."""
+    storage = Post._meta.get_field('image').storage
+    try:
+        source = storage.open(name)
+    except OSError:
+        # Файл пропал с диска: в архиве остаётся только имя в posts.ndjson.
+        return
+    info = entry(name, zipfile.ZIP_STORED)
+    info.file_size = source.size
+    with source, archive.open(info, 'w') as file:
+        for chunk in source.chunks(COPY_CHUNK_SIZE):
+            file.write(chunk)
+            yield stream.pop()
+
+
+def archive_path(user_id):
+    return os.path.join(settings.EXPORT_ROOT, f'{user_id}.zip')
+
+
+def archive_ready(user_id):
+    """Собран ли архив пользователя и не устарел ли он."""
+    try:
+        modified = os.path.getmtime(archive_path(user_id))
+    except OSError:
+        return False
+    return time.time() - modified < settings.EXPORT_MAX_AGE
+
+
+def save_archive(user, path, chunk_size=500, progress=None):
+    """Пишет архив в файл и возвращает его размер.
+
+    Архив сначала собирается рядом в своём временном файле: читатель
+    никогда не увидит недописанный zip, а две параллельные сборки одного
+    архива не пишут в один файл. progress вызывается после каждого куска.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    file = tempfile.NamedTemporaryFile(
+        dir=directory, prefix=f'{name}.', suffix='.part', delete=False
+    )
+    size = 0
+    try:
+        with file:
+            for chunk in user_archive(user, chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+                if progress is not None:
+                    progress()
+        # У временных файлов права 0600, а архив может отдавать прокси.
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, path)
+    finally:
+        if os.path.exists(file.name):
+            os.remove(file.name)
+    return size
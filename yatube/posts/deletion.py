@@ -0,0 +1,184 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.page_cache import invalidate_page_cache
+from posts import follow_cache
+from posts.models import Comment, DeletionJob, Follow, Post, User
+from posts.signals import release_image
+
+
+def user_steps(user_id):
+    """Зависимые записи пользователя в порядке удаления.
+
+    Шаги не пересекаются: свой комментарий к своему посту попадает
+    в total один раз.
+    """
+    return (
+        Comment.objects.filter(
+            Q(author_id=user_id) | Q(post__author_id=user_id)
+        ),
+        Follow.objects.filter(Q(user_id=user_id) | Q(author_id=user_id)),
+        Post.objects.filter(author_id=user_id),
+    )
+
+
+def post_steps(post_id):
+    return (Comment.objects.filter(post_id=post_id),)
+
+
+STEPS = {
+    DeletionJob.USER: (User, user_steps),
+    DeletionJob.POST: (Post, post_steps),
+}
+
+
+def lease():
+    return timezone.now() + timedelta(seconds=settings.DELETION_TIMEOUT)
+
+
+def schedule(kind, object_id, label):
+    """Ставит удаление в очередь.
+
+    Если на объект уже есть ждущее или выполняемое задание, второе не
+    создаётся и возвращается None.
+    """
+    active = DeletionJob.objects.filter(
+        kind=kind, object_id=object_id,
+        status__in=(DeletionJob.PENDING, DeletionJob.RUNNING),
+    )
+    if active.exists():
+        return None
+    _, steps = STEPS[kind]
+    total = sum(queryset.count() for queryset in steps(object_id)) + 1
+    try:
+        with transaction.atomic():
+            return DeletionJob.objects.create(
+                kind=kind, object_id=object_id, label=label, total=total
+            )
+    except IntegrityError:
+        # Параллельный запрос успел поставить задание первым.
+        return None
+
+
+def schedule_user_deletion(user):
+    """Скрывает пользователя сразу, а удаляет потом в фоне."""
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        job = schedule(DeletionJob.USER, user.pk, user.username)
+    invalidate_page_cache()
+    return job
+
+
+def schedule_post_deletion(post):
+    """Скрывает пост сразу, а удаляет потом в фоне."""
+    with transaction.atomic():
+        Post.objects.filter(pk=post.pk).update(is_deleting=True)
+        job = schedule(DeletionJob.POST, post.pk, str(post))
+    invalidate_page_cache()
+    return job
+
+
+def delete_ids(model, ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {column} IN ({placeholders})', ids
+        )
+        return cursor.rowcount
+
+
+def delete_batch(queryset, size):
+    """Удаляет до size записей запроса одним DELETE по id.
+
+    Сигналы и сборщик каскадов Django не участвуют, поэтому картинки
+    постов и кэш подписок освобождаются здесь же, после коммита.
+    """
+    model = queryset.model
+    if model is Post:
+        rows = list(queryset.values_list('pk', 'image')[:size])
+        for _, image in rows:
+            release_image(image)
+    elif model is Follow:
+        rows = list(queryset.values_list('pk', 'user_id')[:size])
+        keys = [follow_cache.cache_key(user_id) for _, user_id in rows]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+    else:
+        rows = list(queryset.values_list('pk')[:size])
+    if not rows:
+        return 0
+    return delete_ids(model, [row[0] for row in rows])
+
+
+def run_job(job, batch_size=500, pause=0):
+    """Удаляет зависимые записи порциями, затем сам объект.
+
+    Каждая порция — отдельная короткая транзакция, так что таблицы не
+    блокируются надолго, а прерванное задание продолжается с того же
+    места: шаги просто выбирают оставшиеся записи. Каждая порция
+    продлевает locked_until: задание без продвижения дольше
+    DELETION_TIMEOUT считается брошенным, и его подхватит claim_job.
+    """
+    model, steps = STEPS[job.kind]
+    try:
+        for queryset in steps(job.object_id):
+            while True:
+                with transaction.atomic():
+                    count = delete_batch(queryset, batch_size)
+                    DeletionJob.objects.filter(pk=job.pk).update(
+                        deleted=F('deleted') + count, locked_until=lease()
+                    )
+                if not count:
+                    break
+                if pause:
+                    time.sleep(pause)
+        with transaction.atomic():
+            model.objects.filter(pk=job.object_id).delete()
+    except Exception as error:
+        job.refresh_from_db(fields=['deleted'])
+        job.status = DeletionJob.FAILED
+        job.error = str(error)
+        job.locked_until = None
+        job.save(update_fields=['status', 'error', 'locked_until'])
+        raise
+    job.refresh_from_db(fields=['deleted'])
+    job.deleted += 1
+    job.status = DeletionJob.DONE
+    job.error = ''
+    job.finished = timezone.now()
+    job.locked_until = None
+    job.save(update_fields=[
+        'deleted', 'status', 'error', 'finished', 'locked_until'
+    ])
+    invalidate_page_cache()
+    return job
+
+
+def claimable(now):
+    return (
+        Q(status=DeletionJob.PENDING)
+        # Задание процесса, который умер, не закончив его.
+        | Q(status=DeletionJob.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim_job():
+    """Следующее задание из очереди.
+
+    Условный UPDATE не даёт двум процессам взять одно и то же задание.
+    """
+    now = timezone.now()
+    for job in DeletionJob.objects.filter(claimable(now)):
+        if DeletionJob.objects.filter(claimable(now), pk=job.pk).update(
+            status=DeletionJob.RUNNING, locked_until=lease()
+        ):
+            job.refresh_from_db()
+            return job
+    return None
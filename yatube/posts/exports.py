@@ -0,0 +1,92 @@
+import csv
+import json
+
+from posts.models import Comment, Follow, Group, Post
+
+# Выгружаемые таблицы: модель, колонки и поле даты для --since.
+EXPORTS = {
+    'groups': (Group, ('id', 'slug', 'title', 'description'), None),
+    'posts': (
+        Post,
+        ('id', 'author_id', 'group_id', 'text', 'pub_date', 'image'),
+        'pub_date',
+    ),
+    'comments': (
+        Comment,
+        ('id', 'post_id', 'author_id', 'text', 'created'),
+        'created',
+    ),
+    'follows': (Follow, ('id', 'user_id', 'author_id'), None),
+}
+
+
+def export_rows(name, queryset=None, since=None, chunk_size=2000):
+    """Кортежи колонок таблицы name по возрастанию pk.
+
+    Строки читаются из базы порциями по chunk_size, так что память не
+    зависит от размера таблицы.
+    """
+    model, fields, date_field = EXPORTS[name]
+    if queryset is None:
+        queryset = model.objects.all()
+    if since is not None and date_field:
+        queryset = queryset.filter(**{f'{date_field}__gt': since})
+    return queryset.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size
+    )
+
+
+class Watermark:
+    """Запоминает самую позднюю дату в проходящих строках.
+
+    Её можно передать в --since следующей выгрузке.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.value = None
+
+    def track(self, rows):
+        for row in rows:
+            value = row[self.index]
+            if self.value is None or value > self.value:
+                self.value = value
+            yield row
+
+
+def isoformat(value):
+    # Даты пишутся с микросекундами, чтобы --since был точным.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def write_ndjson(file, fields, rows):
+    """Пишет по объекту JSON на строку; возвращает число строк."""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=isoformat)
+    count = 0
+    for row in rows:
+        file.write(encoder.encode(dict(zip(fields, row))))
+        file.write('\n')
+        count += 1
+    return count
+
+
+def write_csv(file, fields, rows):
+    """Пишет CSV с заголовком; возвращает число строк."""
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    count = 0
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in row
+        )
+        count += 1
+    return count
+
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+}
@@ -0,0 +1,165 @@
+import json
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import (Atom1Feed, Rss201rev2Feed,
+                                        SyndicationFeed)
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from core.page_cache import page_cache_key, page_cache_version
+from posts.models import Group, Post, User
+from posts.text import render_excerpt, render_text
+
+
+class JsonFeed(SyndicationFeed):
+    """Лента в формате JSON Feed 1.1."""
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def write(self, outfile, encoding):
+        data = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.feed['title'],
+            'home_page_url': self.feed['link'],
+            'feed_url': self.feed['feed_url'],
+            'description': self.feed['description'],
+            'items': [self.item(item) for item in self.items],
+        }
+        outfile.write(json.dumps(data, ensure_ascii=False))
+
+    @staticmethod
+    def item(item):
+        data = {
+            'id': item['unique_id'] or item['link'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_html': item['description'],
+            'date_published': item['pubdate'].isoformat(),
+        }
+        if item['author_name']:
+            data['authors'] = [{'name': item['author_name']}]
+        return data
+
+
+FEED_TYPES = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+    'json': JsonFeed,
+}
+
+
+class SiteFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов.'
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def post_list(self, obj):
+        return Post.objects.visible()
+
+    def items(self, obj):
+        # Последние FEED_SIZE постов берутся по индексу на pub_date.
+        return self.post_list(obj).select_related('author').defer(
+            'placeholder'
+        )[:settings.FEED_SIZE]
+
+    def item_title(self, post):
+        return Truncator(post.text).words(10)
+
+    def item_description(self, post):
+        # У постов, сохранённых в обход save() и ещё не прошедших
+        # backfill_posts, html пуст: рендерим текст на лету.
+        return (
+            post.excerpt_html or post.text_html
+            or render_excerpt(post.text) or render_text(post.text)
+        )
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=(post.pk,))
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+
+class GroupFeed(SiteFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def post_list(self, group):
+        return group.posts.visible()
+
+
+class AuthorFeed(SiteFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username, is_active=True)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Новые записи автора {author.username}.'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def post_list(self, author):
+        return author.posts.all()
+
+
+def feed_etag(request, *args, **kwargs):
+    return f'v{page_cache_version()}'
+
+
+def cached_feed(feed_class):
+    """Представление ленты feed_class в формате из адреса.
+
+    Готовая лента лежит в кэше под версией кэша страниц, а ETag из той же
+    версии позволяет опрашивающим читалкам получать 304 без запросов к БД.
+    """
+    @condition(etag_func=feed_etag)
+    def view(request, kind, **kwargs):
+        if kind not in FEED_TYPES:
+            raise Http404
+        key = f'feed:{page_cache_key(request)}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers.items():
+                response[header] = value
+            return response
+        feed = feed_class()
+        feed.feed_type = FEED_TYPES[kind]
+        response = feed(request, **kwargs)
+        headers = {
+            header: response[header]
+            for header in ('Content-Type', 'Last-Modified')
+            if response.has_header(header)
+        }
+        cache.set(
+            key, (response.content, headers), settings.PAGE_CACHE_TIMEOUT
+        )
+        return response
+    return view
+
+
+site_feed = cached_feed(SiteFeed)
+group_feed = cached_feed(GroupFeed)
+author_feed = cached_feed(AuthorFeed)
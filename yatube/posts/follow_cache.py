@@ -0,0 +1,75 @@
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from posts.models import Follow
+
+
+def cache_key(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user):
+    """Отсортированный массив id авторов, на которых подписан пользователь.
+
+    Массив хранится в кэше байтами и запоминается на объекте пользователя,
+    так что в пределах запроса проверки подписок не ходят ни в БД, ни в кэш.
+    """
+    if not user.is_authenticated:
+        return array('I')
+    if hasattr(user, '_following_ids'):
+        return user._following_ids
+    data = cache.get(cache_key(user.pk))
+    if data is None:
+        ids = array('I', Follow.objects.filter(user=user).order_by(
+            'author_id').values_list('author_id', flat=True))
+        cache.set(
+            cache_key(user.pk), ids.tobytes(), settings.FOLLOWING_CACHE_TIMEOUT
+        )
+    else:
+        ids = array('I')
+        ids.frombytes(data)
+    user._following_ids = ids
+    return ids
+
+
+def is_following(user, author_id):
+    ids = following_ids(user)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def forget_following(user_id):
+    """Сбрасывает закэшированные подписки пользователя.
+
+    Массив не правится на месте: два параллельных запроса потеряли бы одно
+    из изменений. Его пересоберёт из базы следующее чтение.
+    """
+    cache.delete(cache_key(user_id))
+
+
+def followers_key(username):
+    return f'followers:{username}'
+
+
+def followers_version(username):
+    """Версия подписчиков автора для ETag и кэша его профиля в API.
+
+    Подписка меняет только её, а не версию кэша всех страниц сайта.
+    """
+    key = followers_key(username)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_followers(username):
+    try:
+        cache.incr(followers_key(username))
+    except ValueError:
+        followers_version(username)
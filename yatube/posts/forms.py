@@ -1,6 +1,10 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 
 from posts.models import Post, Comment
+from posts.uploads import NormalizeError, normalize_upload
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +12,33 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        """Проверяет картинку по заголовку и пересохраняет её.
+
+        ImageField формы открывает файл лениво и читает только заголовок,
+        поэтому размеры известны до декодирования пикселей: слишком большие
+        картинки отклоняются, не попадая в хранилище.
+        """
+        upload = self.cleaned_data.get('image')
+        if not isinstance(upload, UploadedFile):
+            return upload
+        if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                'Файл больше %s.'
+                % filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE)
+            )
+        width, height = upload.image.size
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                f'Картинка {width}×{height} слишком большая.'
+            )
+        try:
+            return normalize_upload(upload)
+        except NormalizeError as error:
+            raise forms.ValidationError(str(error))
+        except OSError:
+            raise forms.ValidationError('Не удалось обработать картинку.')
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
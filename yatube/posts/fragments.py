@@ -0,0 +1,46 @@
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+
+from core.esi import fragment
+from posts.follow_cache import is_following
+from posts.forms import CommentForm
+
+
+@fragment('switcher')
+def switcher(request):
+    return render_to_string(
+        'posts/includes/switcher.html', request=request
+    )
+
+
+@fragment('follow_button')
+def follow_button(request, author, author_id):
+    context = {
+        'author_username': author,
+        'is_author': request.user.get_username() == author,
+        'following': is_following(request.user, int(author_id)),
+    }
+    return render_to_string(
+        'posts/includes/follow_button.html', context, request=request
+    )
+
+
+@fragment('follow_badge')
+def follow_badge(request, author):
+    if not is_following(request.user, int(author)):
+        return ''
+    return format_html(
+        '<span class="badge bg-primary text-light">{}</span>', 'подписка'
+    )
+
+
+@fragment('post_actions')
+def post_actions(request, post, author):
+    context = {
+        'post_id': post,
+        'is_author': str(request.user.pk) == author,
+        'form': CommentForm(),
+    }
+    return render_to_string(
+        'posts/includes/post_actions.html', context, request=request
+    )
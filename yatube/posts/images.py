@@ -0,0 +1,140 @@
+import base64
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.images import get_image_dimensions
+from PIL import Image
+from sorl.thumbnail.base import EXTENSIONS
+
+MIME_TYPES = {
+    'WEBP': 'image/webp',
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+}
+
+
+def image_dimensions(image):
+    """Размеры картинки по заголовку файла, без полного декодирования.
+
+    Для нечитаемой картинки — (0, 0): пустые размеры значат «ещё не
+    измерено», а эту картинку измерять снова бесполезно.
+    """
+    try:
+        width, height = get_image_dimensions(image)
+    except (OSError, SuspiciousFileOperation):
+        return 0, 0
+    return width or 0, height or 0
+
+
+def image_placeholder(image):
+    """Крошечное размытое JPEG-превью картинки в виде data URI.
+
+    Его можно вставить прямо в html, пока грузится настоящая миниатюра.
+    """
+    size = settings.IMAGE_PLACEHOLDER_SIZE
+    try:
+        with Image.open(image) as source:
+            source.draft('RGB', (size, size))
+            preview = source.convert('RGB')
+        preview.thumbnail((size, size))
+        buffer = BytesIO()
+        preview.save(buffer, 'JPEG', quality=40, optimize=True)
+    except (OSError, SuspiciousFileOperation):
+        return ''
+    finally:
+        rewind(image)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def rewind(image):
+    """Возвращает загруженный файл в начало, не открывая закрытый FieldFile."""
+    file = getattr(image, '_file', image)
+    if file is not None:
+        file.seek(0)
+
+
+def parse_geometry(geometry):
+    width, _, height = str(geometry).partition('x')
+    return int(width) if width else None, int(height) if height else None
+
+
+def thumbnail_size(width, height, geometry, crop=None, padding=False,
+                   upscale=False):
+    """Размер миниатюры sorl-thumbnail, посчитанный по размерам исходника.
+
+    Повторяет арифметику движка sorl, поэтому атрибуты width и height
+    у <img> получаются без чтения файлов и обращения к хранилищу.
+    """
+    target_width, target_height = parse_geometry(geometry)
+    factors = []
+    if target_width:
+        factors.append(target_width / width)
+    if target_height:
+        factors.append(target_height / height)
+    factor = max(factors) if crop else min(factors)
+    if not upscale:
+        factor = min(factor, 1)
+    result_width = int(round(width * factor))
+    result_height = int(round(height * factor))
+    if crop:
+        result_width = min(result_width, target_width or result_width)
+        result_height = min(result_height, target_height or result_height)
+    if padding:
+        result_width = target_width or result_width
+        result_height = target_height or result_height
+    return result_width, result_height
+
+
+def ladder_geometries(geometry):
+    """Геометрии лесенки ширин THUMBNAIL_WIDTHS с тем же соотношением сторон.
+
+    Ширины больше исходной геометрии отбрасываются, сама она всегда
+    последняя ступень.
+    """
+    width, height = parse_geometry(geometry)
+    widths = sorted(
+        {step for step in settings.THUMBNAIL_WIDTHS if step < width} | {width}
+    )
+    for step in widths:
+        if height:
+            yield f'{step}x{round(height * step / width)}'
+        else:
+            yield str(step)
+
+
+def rendition(name):
+    """Геометрия и параметры sorl для миниатюры из THUMBNAIL_RENDITIONS."""
+    geometry, options = settings.THUMBNAIL_RENDITIONS[name]
+    return geometry, dict(options)
+
+
+def rendition_variants():
+    """Все сочетания геометрии и параметров sorl, которые выводят шаблоны.
+
+    По одному на каждую ступень лесенки каждой миниатюры в основном
+    и в дополнительных форматах.
+    """
+    for name in settings.THUMBNAIL_RENDITIONS:
+        geometry, options = rendition(name)
+        for step in ladder_geometries(geometry):
+            yield step, options
+            for image_format in alternate_formats():
+                yield step, {**options, 'format': image_format}
+
+
+@lru_cache(maxsize=None)
+def can_encode(image_format):
+    """Умеют ли Pillow и sorl-thumbnail сохранять миниатюры в этом формате."""
+    Image.init()
+    return image_format in Image.SAVE and image_format in EXTENSIONS
+
+
+def alternate_formats():
+    """Современные форматы из THUMBNAIL_ALTERNATE_FORMATS, доступные здесь."""
+    return [
+        image_format for image_format in settings.THUMBNAIL_ALTERNATE_FORMATS
+        if can_encode(image_format)
+    ]
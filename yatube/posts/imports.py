@@ -0,0 +1,214 @@
+import csv
+import gzip
+import io
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import AutoField, Count
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import StoredFile
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def read_rows(path):
+    """Построчно читает словари из NDJSON или CSV, в том числе .gz."""
+    name = path[:-3] if path.endswith('.gz') else path
+    opener = gzip.open if path.endswith('.gz') else io.open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batched(iterable, size=500):
+    """Порции для запросов с __in: SQLite не берёт больше 999 параметров."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def table_name(path):
+    """Таблица по имени файла: posts.ndjson.gz — posts."""
+    return path.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+class Lookup:
+    """Кэш pk по уникальному полю: username авторов, slug групп.
+
+    Недостающие ключи порции ищутся одним запросом, а не найденные в базе
+    создаются через create_missing.
+    """
+
+    def __init__(self, model, field, create_missing):
+        self.model = model
+        self.field = field
+        self.create_missing = create_missing
+        self.cache = {}
+
+    def prefetch(self, keys):
+        missing = {key for key in keys if key and key not in self.cache}
+        if not missing:
+            return
+        self.cache.update(self.model.objects.filter(
+            **{f'{self.field}__in': missing}
+        ).values_list(self.field, 'pk'))
+        missing -= set(self.cache)
+        if missing:
+            self.model.objects.bulk_create(
+                self.create_missing(key) for key in sorted(missing)
+            )
+            self.cache.update(self.model.objects.filter(
+                **{f'{self.field}__in': missing}
+            ).values_list(self.field, 'pk'))
+
+    def __getitem__(self, key):
+        return self.cache[key]
+
+
+def new_user(username):
+    user = User(username=username)
+    user.set_unusable_password()
+    return user
+
+
+def new_group(slug):
+    return Group(slug=slug, title=slug, description='')
+
+
+class Importer:
+    """Строит объекты моделей из строк выгрузки.
+
+    Ссылки можно задавать как pk (author_id, group_id) или как username
+    и slug (author, group): такие ссылки разрешаются через Lookup.
+    """
+
+    def __init__(self):
+        self.users = Lookup(User, 'username', new_user)
+        self.groups = Lookup(Group, 'slug', new_group)
+        self.builders = {
+            'groups': (Group, self.build_group),
+            'posts': (Post, self.build_post),
+            'comments': (Comment, self.build_comment),
+            'follows': (Follow, self.build_follow),
+        }
+
+    def build(self, table, rows):
+        model, builder = self.builders[table]
+        self.users.prefetch(
+            row.get(key) for row in rows for key in ('author', 'user')
+        )
+        self.groups.prefetch(row.get('group') for row in rows)
+        return model, [builder(row) for row in rows]
+
+    def ref(self, row, name, lookup):
+        if row.get(f'{name}_id') not in (None, ''):
+            return int(row[f'{name}_id'])
+        if row.get(name):
+            return lookup[row[name]]
+        return None
+
+    @staticmethod
+    def pk(row):
+        return int(row['id']) if row.get('id') not in (None, '') else None
+
+    @staticmethod
+    def date(row, name):
+        """Дата из выгрузки, а если её нет — текущее время."""
+        if row.get(name):
+            return parse_datetime(row[name])
+        return timezone.now()
+
+    def build_group(self, row):
+        return Group(
+            pk=self.pk(row), slug=row['slug'], title=row['title'],
+            description=row.get('description', ''),
+        )
+
+    def build_post(self, row):
+        post = Post(
+            pk=self.pk(row), text=row['text'],
+            author_id=self.ref(row, 'author', self.users),
+            group_id=self.ref(row, 'group', self.groups),
+            image=row.get('image') or '',
+            pub_date=self.date(row, 'pub_date'),
+        )
+        post.render_text()
+        return post
+
+    def build_comment(self, row):
+        return Comment(
+            pk=self.pk(row), post_id=int(row['post_id']), text=row['text'],
+            author_id=self.ref(row, 'author', self.users),
+            created=self.date(row, 'created'),
+        )
+
+    def build_follow(self, row):
+        return Follow(
+            pk=self.pk(row),
+            user_id=self.ref(row, 'user', self.users),
+            author_id=self.ref(row, 'author', self.users),
+        )
+
+
+def insert_rows(model, objects, batch_size):
+    """bulk_create с ignore_conflicts, но без pre_save полей.
+
+    Значения пишутся как есть, как при loaddata: auto_now_add не затирает
+    даты из выгрузки, а Importer сам ставит текущее время пустым датам.
+    """
+    fields = model._meta.concrete_fields
+    groups = (
+        ([obj for obj in objects if obj.pk is not None], fields),
+        ([obj for obj in objects if obj.pk is None], [
+            field for field in fields if not isinstance(field, AutoField)
+        ]),
+    )
+    for group, group_fields in groups:
+        if not group:
+            continue
+        size = min(
+            batch_size, connection.ops.bulk_batch_size(group_fields, group)
+        )
+        for batch in batched(group, max(size, 1)):
+            model._base_manager._insert(
+                batch, fields=group_fields, raw=True, ignore_conflicts=True
+            )
+
+
+def sync_image_refs(names):
+    """Выставляет StoredFile.refs по числу постов с каждой картинкой.
+
+    Счётчик пересчитывается, а не увеличивается, так что повтор порции
+    после перезапуска его не накручивает. Имена не из хранилища по хэшу
+    и отсутствующие на диске файлы пропускаются.
+    """
+    storage = Post._meta.get_field('image').storage
+    names = sorted({
+        name for name in names if name and storage.is_hashed(name)
+    })
+    for batch in batched(names):
+        counts = Post.objects.filter(image__in=batch).order_by().values(
+            'image'
+        ).annotate(refs=Count('pk')).values_list('image', 'refs')
+        stored = set(StoredFile.objects.select_for_update().filter(
+            name__in=batch
+        ).values_list('name', flat=True))
+        for name, refs in counts:
+            if name in stored:
+                StoredFile.objects.filter(name=name).update(refs=refs)
+            elif storage.exists(name):
+                StoredFile.objects.create(
+                    name=name, size=storage.size(name), refs=refs
+                )
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from posts.images import image_dimensions, image_placeholder
+from posts.models import Post
+
+
+def fill_dimensions(post):
+    post.width, post.height = image_dimensions(post.image)
+    post.image.close()
+
+
+def fill_placeholder(post):
+    post.placeholder = image_placeholder(post.image)
+    post.image.close()
+
+
+def fill_text(post):
+    post.render_text()
+
+
+# Группа производных полей: функция пересчёта, поля для записи и условие,
+# по которому находятся ещё не заполненные строки.
+DERIVED_FIELDS = {
+    'dimensions': (
+        fill_dimensions,
+        ('width', 'height'),
+        Q(width__isnull=True) & ~Q(image=''),
+    ),
+    'placeholder': (
+        fill_placeholder,
+        ('placeholder',),
+        Q(placeholder='') & ~Q(image=''),
+    ),
+    'text': (
+        fill_text,
+        ('title', 'text_html', 'excerpt_html'),
+        (Q(text_html='') | Q(title='')) & ~Q(text=''),
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'Пачками заполняет производные поля постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'groups', nargs='*',
+            help=f'Какие поля пересчитать: {", ".join(DERIVED_FIELDS)}. '
+                 'По умолчанию все.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько постов обновлять за один запрос.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересчитать поля и у уже заполненных постов.'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['groups']) - set(DERIVED_FIELDS)
+        if unknown:
+            raise CommandError(f'Неизвестные поля: {", ".join(unknown)}')
+        for group in options['groups'] or DERIVED_FIELDS:
+            updated = self.backfill(
+                *DERIVED_FIELDS[group], options['batch_size'],
+                options['force']
+            )
+            self.stdout.write(f'{group}: обновлено постов {updated}')
+
+    def backfill(self, fill, fields, pending, batch_size, force):
+        queryset = Post.objects.order_by('pk')
+        if not force:
+            queryset = queryset.filter(pending)
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return updated
+            for post in batch:
+                fill(post)
+            Post.objects.bulk_update(batch, fields)
+            last_pk = batch[-1].pk
+            updated += len(batch)
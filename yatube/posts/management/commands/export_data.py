@@ -0,0 +1,71 @@
+import gzip
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts.exports import EXPORTS, WRITERS, Watermark, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает группы, посты, комментарии и подписки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*',
+            help=f'Что выгрузить: {", ".join(EXPORTS)}. По умолчанию всё.'
+        )
+        parser.add_argument(
+            '--format', choices=WRITERS, default='ndjson',
+            help='Формат файлов.'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать файлы gzip.'
+        )
+        parser.add_argument(
+            '--since',
+            help='Только записи с pub_date/created позже этого момента.'
+        )
+        parser.add_argument(
+            '--output', default='.',
+            help='Каталог для файлов.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='По сколько строк читать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(EXPORTS)
+        if unknown:
+            raise CommandError(f'Неизвестные таблицы: {", ".join(unknown)}')
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since ожидает дату в формате ISO 8601')
+        os.makedirs(options['output'], exist_ok=True)
+        for name in options['tables'] or EXPORTS:
+            path = os.path.join(
+                options['output'], f'{name}.{options["format"]}'
+            )
+            if options['gzip']:
+                path += '.gz'
+                file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+            else:
+                file = open(path, 'w', encoding='utf-8', newline='')
+            _, fields, date_field = EXPORTS[name]
+            rows = export_rows(
+                name, since=since, chunk_size=options['chunk_size']
+            )
+            watermark = None
+            if date_field:
+                watermark = Watermark(fields.index(date_field))
+                rows = watermark.track(rows)
+            with file:
+                count = WRITERS[options['format']](file, fields, rows)
+            message = f'{name}: {count} → {path}'
+            if watermark and watermark.value:
+                message += f', --since {watermark.value.isoformat()}'
+            self.stdout.write(message)
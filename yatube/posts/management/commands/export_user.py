@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.archive import save_archive
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Собирает zip со всеми данными пользователя.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--output',
+            help='Путь к архиву. По умолчанию yatube-<username>.zip.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='По сколько строк читать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Нет пользователя {options["username"]}')
+        path = options['output'] or f'yatube-{user.username}.zip'
+        size = save_archive(user, path, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{path}: {size / 1024:.1f} КБ'
+        ))
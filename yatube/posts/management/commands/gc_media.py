@@ -0,0 +1,199 @@
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+
+from core.models import StoredFile
+from posts.models import Post
+
+
+def walk(path):
+    """Обходит каталог через os.scandir, отдавая файлы в порядке имён."""
+    try:
+        with os.scandir(path) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk(entry.path)
+        elif entry.is_file(follow_symlinks=False):
+            yield entry
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT картинки, на которые не ссылается ни один '
+        'пост, их миниатюры и устаревшие записи sorl-thumbnail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=0,
+            help='Не больше стольких удалений в секунду; 0 — без ограничения.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд: их могут '
+                 'как раз загружать.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='По сколько имён картинок читать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.rate = options['rate']
+        self.chunk_size = options['chunk_size']
+        self.started, self.deletions = time.monotonic(), 0
+        # При пробном запуске записи не удаляются, и миниатюры устаревших
+        # картинок запоминаются, чтобы их показать.
+        self.doomed = set()
+        sources = self.collect_thumbnails()
+        removed, freed = 0, 0
+        cutoff = time.time() - options['min_age']
+        upload_root = Post._meta.get_field('image').upload_to
+        for batch in batched(self.old_files(upload_root, cutoff),
+                             self.chunk_size):
+            names = [name for name, _ in batch]
+            refs = dict(StoredFile.objects.filter(name__in=names).values_list(
+                'name', 'refs'
+            ))
+            referenced = self.referenced(names)
+            for name, size in batch:
+                if name in referenced:
+                    continue
+                if self.remove_image(name, refs.get(name)):
+                    removed += 1
+                    freed += size
+        thumbnail_root = thumbnail_settings.THUMBNAIL_PREFIX
+        for name, size in self.old_files(thumbnail_root, cutoff):
+            if name not in self.doomed and default.kvstore.get(
+                ImageFile(name, default.storage)
+            ):
+                continue
+            self.remove_file(name)
+            removed += 1
+            freed += size
+        verb = 'Будет удалено' if self.dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: файлов {removed} ({filesizeformat(freed)}), '
+            f'картинок в хранилище миниатюр {sources}'
+        ))
+
+    def old_files(self, root, cutoff):
+        """Имена и размеры файлов каталога, не менявшихся с cutoff."""
+        for entry in walk(os.path.join(settings.MEDIA_ROOT, root)):
+            stat = entry.stat()
+            if stat.st_mtime > cutoff:
+                continue
+            name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+            yield name.replace(os.sep, '/'), stat.st_size
+
+    def referenced(self, names):
+        """Какие из имён картинок сейчас указаны в постах."""
+        return set(Post.objects.filter(image__in=list(names)).values_list(
+            'image', flat=True
+        ))
+
+    def collect_thumbnails(self):
+        """Чистит хранилище sorl-thumbnail от миниатюр удалённых картинок.
+
+        Вместе с записями удаляются и файлы миниатюр. Исходные картинки
+        проверяются порциями по chunk_size. Возвращает число таких картинок.
+        """
+        kvstore = default.kvstore
+        raw_keys = kvstore._find_keys_raw(add_prefix('', 'thumbnails'))
+        if hasattr(raw_keys, 'iterator'):
+            raw_keys = raw_keys.iterator()
+        sources = (
+            kvstore._get(del_prefix(raw_key)) for raw_key in raw_keys
+        )
+        stale = 0
+        for batch in batched(
+            (source for source in sources if source is not None),
+            self.chunk_size,
+        ):
+            referenced = self.referenced(source.name for source in batch)
+            for source in batch:
+                if source.name in referenced:
+                    continue
+                stale += 1
+                self.stdout.write(f'миниатюры {source.name}')
+                if self.dry_run:
+                    self.doomed.update(self.thumbnail_names(source))
+                else:
+                    kvstore.delete(source)
+                    self.throttle()
+        return stale
+
+    def thumbnail_names(self, source):
+        kvstore = default.kvstore
+        for key in kvstore._get(source.key, identity='thumbnails') or ():
+            thumbnail = kvstore._get(key)
+            if thumbnail is not None:
+                yield thumbnail.name
+
+    def remove_image(self, name, refs):
+        """Удаляет картинку, если на неё так и не появилось ссылок.
+
+        Пока шёл обход, тот же файл могли загрузить заново: дедупликация
+        не меняет его mtime, но берёт ссылку в StoredFile. Поэтому перед
+        удалением под блокировкой строки проверяется, что счётчик ссылок
+        остался прежним refs и посты на файл по-прежнему не ссылаются.
+        Неизменный счётчик без постов — ссылки, которые не успели снять.
+        """
+        if self.dry_run:
+            self.stdout.write(name)
+            return True
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(
+                name=name
+            ).first()
+            current = stored.refs if stored is not None else None
+            if current != refs or self.referenced([name]):
+                return False
+            self.remove_file(name)
+            if stored is not None:
+                stored.delete()
+        return True
+
+    def remove_file(self, name):
+        self.stdout.write(name)
+        if self.dry_run:
+            return
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, name))
+        except FileNotFoundError:
+            pass
+        self.throttle()
+
+    def throttle(self):
+        if not self.rate:
+            return
+        self.deletions += 1
+        delay = self.started + self.deletions / self.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
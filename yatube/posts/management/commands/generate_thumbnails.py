@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+from functools import partial
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from posts.images import rendition_variants
+from posts.models import Post
+
+
+def generate(variants, item):
+    """Создаёт недостающие миниатюры одной картинки.
+
+    Выполняется в процессе пула, поэтому получает только pk и имя файла.
+    Возвращает pk, число созданных миниатюр и текст ошибки.
+    """
+    pk, name = item
+    image = Post(pk=pk, image=name).image
+    source = ImageFile(image)
+    before = len(default.kvstore._get(source.key, identity='thumbnails') or ())
+    try:
+        for geometry, options in variants:
+            get_thumbnail(image, geometry, **options)
+    except Exception as error:
+        return pk, 0, f'{name}: {error}'
+    finally:
+        image.close()
+    after = len(default.kvstore._get(source.key, identity='thumbnails') or ())
+    return pk, after - before, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее генерирует все миниатюры из THUMBNAIL_RENDITIONS '
+        'для картинок постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Сколько процессов генерируют миниатюры; 0 — в этом процессе.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(
+                tempfile.gettempdir(), 'yatube-thumbnails-checkpoint'
+            ),
+            help='Файл с pk последнего обработанного поста для продолжения.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на сохранённую позицию.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='По сколько постов читать из базы и сохранять позицию.'
+        )
+
+    def handle(self, *args, **options):
+        self.checkpoint = options['checkpoint']
+        last_pk = 0 if options['restart'] else self.load_checkpoint()
+        if last_pk:
+            self.stdout.write(f'Продолжаю после поста {last_pk}')
+        items = (
+            Post.objects.exclude(image='').filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'image')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        variants = list(rendition_variants())
+        task = partial(generate, variants)
+        started = time.perf_counter()
+        images, created = 0, 0
+        if options['processes']:
+            # Процессы пула открывают свои соединения с базой.
+            connections.close_all()
+            pool = Pool(options['processes'])
+            results = pool.imap(task, items, chunksize=8)
+        else:
+            pool = None
+            results = map(task, items)
+        try:
+            for pk, count, error in results:
+                if error:
+                    self.stderr.write(error)
+                images += 1
+                created += count
+                last_pk = pk
+                if images % options['chunk_size'] == 0:
+                    self.save_checkpoint(last_pk)
+                    self.report(images, created, started)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            self.save_checkpoint(last_pk)
+        self.report(images, created, started)
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def report(self, images, created, started):
+        elapsed = time.perf_counter() - started
+        rate = images / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Картинок: {images}, новых миниатюр: {created}, '
+            f'{rate:.1f} картинок/с'
+        )
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as file:
+                return int(file.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def save_checkpoint(self, pk):
+        if pk:
+            with open(self.checkpoint, 'w') as file:
+                file.write(str(pk))
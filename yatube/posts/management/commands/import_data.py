@@ -0,0 +1,150 @@
+import json
+import os
+import tempfile
+import time
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.page_cache import invalidate_page_cache
+from posts import follow_cache
+from posts.imports import (
+    Importer, batched, insert_rows, read_rows, sync_image_refs, table_name
+)
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро загружает группы, посты, комментарии и подписки '
+        'из NDJSON или CSV, в том числе выгруженные export_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='+',
+            help='Файлы вида posts.ndjson, comments.csv.gz; таблица '
+                 'берётся из имени. Группы и посты загружайте первыми.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк вставлять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(
+                tempfile.gettempdir(), 'yatube-import-checkpoint'
+            ),
+            help='Файл с числом загруженных строк каждого файла.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на сохранённый прогресс.'
+        )
+
+    def handle(self, *args, **options):
+        importer = Importer()
+        for path in options['files']:
+            if table_name(path) not in importer.builders:
+                raise CommandError(f'Не понятно, какая таблица в {path}')
+        self.checkpoint = options['checkpoint']
+        progress = {} if options['restart'] else self.load_checkpoint()
+        started = time.perf_counter()
+        total = 0
+        for path in options['files']:
+            total += self.load(importer, path, progress, options['batch_size'])
+        self.finish()
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {total} за {elapsed:.1f} с'
+        ))
+
+    def load(self, importer, path, progress, batch_size):
+        """Загружает файл порциями; каждая порция в своей транзакции.
+
+        После коммита порции число загруженных строк записывается
+        в checkpoint, и при перезапуске они пропускаются. Конфликты по pk
+        игнорируются, так что повтор уже вставленной порции безопасен;
+        в отчёт попадают только действительно вставленные строки.
+        """
+        table = table_name(path)
+        done = progress.get(path, 0)
+        rows = islice(read_rows(path), done, None)
+        loaded = 0
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                model, objects = importer.build(table, chunk)
+                loaded += self.insert(model, objects, batch_size)
+                if model is Post:
+                    sync_image_refs(post.image.name for post in objects)
+            done += len(chunk)
+            progress[path] = done
+            self.save_checkpoint(progress)
+        self.stdout.write(f'{path}: {loaded} строк ({table})')
+        return loaded
+
+    def insert(self, model, objects, batch_size):
+        """Вставляет порцию и возвращает, сколько строк реально добавлено.
+
+        Вставка с ignore_conflicts молча пропускает конфликтующие
+        строки и не сообщает, какие именно. Новые строки — это всё, что
+        легло выше прежнего максимального pk, плюс явные pk ниже него,
+        которых до вставки не было.
+        """
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        keys = [obj.pk for obj in objects if obj.pk is not None]
+        keys = [pk for pk in keys if pk <= last]
+        before = self.count(model, keys)
+        insert_rows(model, objects, batch_size)
+        return (
+            self.count(model, keys) - before
+            + model.objects.filter(pk__gt=last).count()
+        )
+
+    @staticmethod
+    def count(model, keys):
+        return sum(
+            model.objects.filter(pk__in=batch).count()
+            for batch in batched(keys)
+        )
+
+    def finish(self):
+        """Обслуживание, отложенное до конца загрузки.
+
+        Последовательности pk сдвигаются за вставленные явно id, кэши
+        страниц и подписок сбрасываются один раз, а не на каждую строку.
+        """
+        models = [User, Group, Post, Comment, Follow]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        invalidate_page_cache()
+        cache.delete_many([
+            follow_cache.cache_key(pk)
+            for pk in User.objects.values_list('pk', flat=True).iterator()
+        ])
+        with connection.cursor() as cursor:
+            if connection.vendor in ('postgresql', 'sqlite'):
+                cursor.execute('ANALYZE')
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_checkpoint(self, progress):
+        with open(self.checkpoint, 'w') as file:
+            json.dump(progress, file)
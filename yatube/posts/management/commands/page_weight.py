@@ -0,0 +1,129 @@
+import re
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group
+
+IMG_RE = re.compile(r'<img\b[^>]*>')
+SOURCE_RE = re.compile(r'<source\b[^>]*>')
+PICTURE_RE = re.compile(r'<picture>(.*?)</picture>|<img\b[^>]*>', re.S)
+ATTR_RE = re.compile(r'([\w-]+)="([^"]*)"')
+MEDIA_RE = re.compile(r'\((max|min)-width:\s*(\d+)px\)')
+
+
+def slot_width(sizes, viewport):
+    """Ширина слота из атрибута sizes для заданной ширины экрана."""
+    for entry in sizes.split(','):
+        entry = entry.strip()
+        match = MEDIA_RE.match(entry)
+        if match:
+            kind, limit = match.group(1), int(match.group(2))
+            if (viewport > limit) if kind == 'max' else (viewport < limit):
+                continue
+            entry = entry[match.end():].strip()
+        if entry.endswith('vw'):
+            return viewport * float(entry[:-2]) / 100
+        return float(entry.rstrip('px'))
+    return viewport
+
+
+def chosen_candidate(attrs, viewport, dpr):
+    """Кандидат из srcset, который выбрал бы браузер."""
+    if 'srcset' not in attrs:
+        return attrs['src']
+    needed = slot_width(attrs.get('sizes', '100vw'), viewport) * dpr
+    candidates = sorted(
+        (int(width.rstrip('w')), url)
+        for url, width in (
+            part.strip().rsplit(' ', 1) for part in attrs['srcset'].split(',')
+        )
+    )
+    for width, url in candidates:
+        if width >= needed:
+            return url
+    return candidates[-1][1]
+
+
+def picked_source(markup, accepted):
+    """Атрибуты <source> или <img>, которые браузер возьмёт из <picture>."""
+    img = dict(ATTR_RE.findall(IMG_RE.search(markup).group()))
+    for tag in SOURCE_RE.findall(markup):
+        attrs = dict(ATTR_RE.findall(tag))
+        if attrs.get('type') in accepted:
+            return img, attrs
+    return img, img
+
+
+def file_size(url):
+    name = unquote(url[len(settings.MEDIA_URL):])
+    try:
+        return default_storage.size(name)
+    except OSError:
+        return 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает вес страниц-лент: html и картинки до (все 960px JPEG '
+        'сразу) и после (srcset, современные форматы и ленивая загрузка).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--viewport', type=int, default=390)
+        parser.add_argument('--dpr', type=float, default=2)
+        parser.add_argument(
+            '--eager', type=int, default=2,
+            help='Сколько картинок видно на первом экране.'
+        )
+        parser.add_argument(
+            '--accept', default='image/avif,image/webp',
+            help='Форматы из <source>, которые понимает браузер.'
+        )
+
+    def handle(self, *args, **options):
+        urls = [reverse('posts:index')] + [
+            reverse('posts:group_list', args=(slug,))
+            for slug in Group.objects.values_list('slug', flat=True)[:5]
+        ]
+        totals = [0, 0, 0, 0]
+        self.stdout.write(
+            f'{"html":>8} {"до":>10} {"после":>10} {"первый экран":>13}  url'
+        )
+        for url in urls:
+            row = self.measure(url, **options)
+            totals = [total + value for total, value in zip(totals, row)]
+            self.stdout.write(self.format_row(row, url))
+        self.stdout.write(self.format_row(totals, 'итого'))
+
+    @staticmethod
+    def format_row(row, title):
+        html, before, after, first_screen = (value // 1024 for value in row)
+        return (
+            f'{html:>6}КБ {before:>8}КБ {after:>8}КБ {first_screen:>11}КБ  '
+            f'{title}'
+        )
+
+    def measure(self, url, viewport, dpr, eager, accept, **options):
+        html = Client().get(url).content.decode()
+        accepted = accept.split(',')
+        before = after = first_screen = 0
+        images = [
+            picked_source(match.group(), accepted)
+            for match in PICTURE_RE.finditer(html)
+        ]
+        images = [
+            (img, source) for img, source in images
+            if img.get('src', '').startswith(settings.MEDIA_URL)
+        ]
+        for number, (img, source) in enumerate(images):
+            before += file_size(img['src'])
+            size = file_size(chosen_candidate(source, viewport, dpr))
+            after += size
+            if img.get('loading') != 'lazy' or number < eager:
+                first_screen += size
+        return len(html.encode()), before, after, first_screen
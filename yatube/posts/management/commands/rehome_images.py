@@ -0,0 +1,76 @@
+import posixpath
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пачками переносит картинки постов в хранилище по хэшу содержимого.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Сколько постов переносить за одну транзакцию.'
+        )
+        parser.add_argument(
+            '--keep-originals', action='store_true',
+            help='Не удалять старые файлы после переноса.'
+        )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        self.storage = field.storage
+        queryset = Post.objects.exclude(image='').only('pk', 'image')
+        last_pk, moved, skipped = 0, 0, 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')[
+                    :options['batch_size']
+                ]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            originals, changed = set(), []
+            with transaction.atomic():
+                for post in batch:
+                    original = post.image.name
+                    if self.storage.is_hashed(original):
+                        continue
+                    name = self.rehome(field, post, original)
+                    if name is None:
+                        skipped += 1
+                        continue
+                    post.image.name = name
+                    originals.add(original)
+                    changed.append(post)
+                Post.objects.bulk_update(changed, ['image'])
+            if not options['keep_originals']:
+                # Старый файл может быть общим с постом из следующей пачки.
+                originals -= set(
+                    Post.objects.filter(image__in=originals)
+                    .values_list('image', flat=True)
+                )
+                for original in originals:
+                    self.storage.remove(original)
+            moved += len(changed)
+            self.stdout.write(f'Перенесено картинок: {moved}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: перенесено {moved}, пропущено {skipped}'
+        ))
+
+    def rehome(self, field, post, original):
+        try:
+            with self.storage.open(original) as content:
+                name = field.generate_filename(
+                    post, posixpath.basename(original)
+                )
+                return self.storage.save(name, content)
+        except (OSError, SuspiciousFileOperation) as error:
+            self.stderr.write(f'{original}: {error}')
+            return None
@@ -0,0 +1,36 @@
+import traceback
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задания на удаление пользователей и постов из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько записей удалять одним запросом.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между порциями в секундах, чтобы не нагружать базу.'
+        )
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        job = claim_job()
+        while job is not None:
+            try:
+                run_job(job, options['batch_size'], options['pause'])
+            except Exception:
+                failed += 1
+                self.stderr.write(f'{job}: {traceback.format_exc()}')
+            else:
+                done += 1
+                self.stdout.write(f'{job}: удалено записей {job.deleted}')
+            job = claim_job()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово заданий: {done}, с ошибкой: {failed}'
+        ))
@@ -0,0 +1,100 @@
+import random
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from faker import Faker
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+def fake_image(width, height):
+    """JPEG с шумом: сжимается как фотография, а не как заливка."""
+    image = Image.effect_noise((width // 4, height // 4), 64).resize(
+        (width, height), Image.BICUBIC
+    ).convert('RGB')
+    tint = Image.new('RGB', (width, height), tuple(
+        random.randrange(256) for _ in range(3)
+    ))
+    image = Image.blend(image, tint, 0.5)
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    return ContentFile(buffer.getvalue())
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу случайными пользователями, постами и картинками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument(
+            '--images', type=int, default=40,
+            help='Сколько из постов получат картинку.'
+        )
+        parser.add_argument('--comments', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        users = [
+            User.objects.create_user(
+                username=f'{fake.user_name()}{number}',
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+            )
+            for number in range(options['users'])
+        ]
+        groups = [
+            Group.objects.create(
+                title=fake.sentence(nb_words=3),
+                slug=f'group-{number}',
+                description=fake.paragraph(),
+            )
+            for number in range(options['groups'])
+        ]
+        posts = [
+            Post(
+                author=random.choice(users),
+                group=random.choice(groups + [None]),
+                text='\n\n'.join(fake.paragraphs(random.randint(1, 6))),
+            )
+            for _ in range(options['posts'] - options['images'])
+        ]
+        for post in posts:
+            post.render_text()
+        Post.objects.bulk_create(posts)
+        for _ in range(options['images']):
+            post = Post(
+                author=random.choice(users),
+                group=random.choice(groups + [None]),
+                text='\n\n'.join(fake.paragraphs(random.randint(1, 6))),
+            )
+            image = fake_image(
+                random.randint(800, 2400), random.randint(600, 1600)
+            )
+            post.image.save(f'{fake.uuid4()}.jpg', image, save=False)
+            post.save()
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            Comment(
+                post_id=random.choice(post_ids),
+                author=random.choice(users),
+                text=fake.sentence(),
+            )
+            for _ in range(options['comments'])
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for user in users
+            for author in random.sample(users, min(5, len(users)))
+            if author != user
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {options["posts"]}'
+        ))
@@ -0,0 +1,90 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэш первых страниц главной, групп '
+        'и самых популярных профилей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=3,
+            help='Сколько первых страниц каждой ленты прогревать.'
+        )
+        parser.add_argument(
+            '--profiles', type=int, default=10,
+            help='Сколько профилей с наибольшим числом подписчиков брать.'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Количество потоков для параллельного прогрева.'
+        )
+
+    def handle(self, *args, **options):
+        urls = self.get_urls(options['pages'], options['profiles'])
+        started = time.perf_counter()
+        if options['threads'] > 1:
+            with ThreadPoolExecutor(options['threads']) as executor:
+                results = list(executor.map(self.fetch_in_thread, urls))
+        else:
+            results = [self.fetch(url) for url in urls]
+        for url, status, elapsed in results:
+            self.stdout.write(f'{status} {elapsed * 1000:8.1f} мс  {url}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {len(results)} '
+            f'за {time.perf_counter() - started:.2f} с'
+        ))
+
+    def get_urls(self, pages, profiles):
+        urls = self.paginated(
+            reverse('posts:index'), Post.objects.count(), pages
+        )
+        groups = Group.objects.annotate(
+            posts_count=Count('posts')
+        ).values_list('slug', 'posts_count')
+        for slug, posts_count in groups:
+            urls += self.paginated(
+                reverse('posts:group_list', args=(slug,)), posts_count, pages
+            )
+        authors = User.objects.annotate(
+            followers_count=Count('following', distinct=True),
+            posts_count=Count('posts', distinct=True),
+        ).order_by('-followers_count').values_list('username', 'posts_count')
+        for username, posts_count in authors[:profiles]:
+            urls += self.paginated(
+                reverse('posts:profile', args=(username,)), posts_count, pages
+            )
+        return urls
+
+    @staticmethod
+    def paginated(url, posts_count, pages):
+        """Адреса первых страниц ленты, не выходя за последнюю."""
+        last_page = max(ceil(posts_count / settings.NUM_POSTS), 1)
+        return [url] + [
+            f'{url}?page={page}'
+            for page in range(2, min(pages, last_page) + 1)
+        ]
+
+    @staticmethod
+    def fetch(url):
+        started = time.perf_counter()
+        response = Client().get(url)
+        return url, response.status_code, time.perf_counter() - started
+
+    def fetch_in_thread(self, url):
+        try:
+            return self.fetch(url)
+        finally:
+            connection.close()
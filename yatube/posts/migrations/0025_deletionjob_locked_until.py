@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_deletionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionjob',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Занято воркером до'),
+        ),
+    ]
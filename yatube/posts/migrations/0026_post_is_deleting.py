@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_deletionjob_locked_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_deleting',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Ждёт удаления'),
+        ),
+        migrations.AddConstraint(
+            model_name='deletionjob',
+            constraint=models.UniqueConstraint(condition=models.Q(status__in=('pending', 'running')), fields=('kind', 'object_id'), name='deletionjob_one_active'),
+        ),
+    ]
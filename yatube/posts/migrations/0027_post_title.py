@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_post_is_deleting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='title',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Заголовок'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import ContentAddressedStorage
+from posts.images import image_dimensions, image_placeholder
+from posts.text import render_excerpt, render_text, render_title
+
 
 User = get_user_model()
 
@@ -26,6 +30,16 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Посты, которые видят читатели.
+
+        Посты неактивных авторов и посты, ждущие фонового удаления,
+        скрыты отовсюду, хотя ещё лежат в базе.
+        """
+        return self.filter(author__is_active=True, is_deleting=False)
+
+
 class Post(models.Model):
     TEST_NUM_POSTS = 15
 
@@ -54,15 +68,72 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка к посту',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    placeholder = models.TextField(
+        'Превью картинки', blank=True, editable=False
+    )
+    title = models.CharField(
+        'Заголовок', max_length=255, blank=True, editable=False
+    )
+    text_html = models.TextField('Текст в html', blank=True, editable=False)
+    excerpt_html = models.TextField(
+        'Начало текста в html', blank=True, editable=False
+    )
+    is_deleting = models.BooleanField(
+        'Ждёт удаления', default=False, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-pk')
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:Post.TEST_NUM_POSTS]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Имя картинки из базы: по нему после сохранения видно, что
+        # картинку заменили и старую пора отпустить в хранилище.
+        image = post.__dict__.get('image')
+        post._stored_image = getattr(image, 'name', image)
+        return post
+
+    def render_text(self):
+        self.title = render_title(self.text)
+        self.text_html = render_text(self.text)
+        self.excerpt_html = render_excerpt(self.text)
+
+    def save(self, *args, **kwargs):
+        self.render_text()
+        if not self.image:
+            self.width = self.height = None
+            self.placeholder = ''
+        elif not self.image._committed:
+            # Уже сохранённые картинки измеряет backfill_posts.
+            self.width, self.height = image_dimensions(self.image)
+            self.placeholder = image_placeholder(self.image)
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     TEST_NUM_COMMENTS = 15
@@ -112,3 +183,61 @@ class Follow(models.Model):
                 name='author_not_follower',
             ),
         ]
+
+
+class DeletionJob(models.Model):
+    """Фоновое удаление пользователя или поста с зависимыми записями."""
+    USER = 'user'
+    POST = 'post'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (POST, 'Пост'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Что удаляется', max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField('id объекта')
+    label = models.CharField('Объект', max_length=255)
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=PENDING,
+        db_index=True,
+    )
+    total = models.PositiveIntegerField('Всего записей', default=0)
+    deleted = models.PositiveIntegerField('Удалено записей', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    locked_until = models.DateTimeField(
+        'Занято воркером до', null=True, blank=True
+    )
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Удаление'
+        verbose_name_plural = 'Удаления'
+        constraints = [
+            # Одно незавершённое задание на объект.
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                condition=models.Q(status__in=('pending', 'running')),
+                name='deletionjob_one_active',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.label}'
+
+    @property
+    def progress(self):
+        if not self.total:
+            return 100 if self.status == self.DONE else 0
+        return min(100, self.deleted * 100 // self.total)
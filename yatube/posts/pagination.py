@@ -0,0 +1,56 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(created, pk):
+    """Курсор ленты: дата и pk последней показанной записи."""
+    value = f'{created.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(дата, pk) из курсора; ValueError, если курсор испорчен."""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        created, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+    except UnicodeDecodeError:
+        raise ValueError(cursor)
+    return datetime.fromisoformat(created), int(pk)
+
+
+def page_cursor(page_obj):
+    """Курсор после последнего поста страницы, если дальше есть посты."""
+    if not page_obj.has_next():
+        return ''
+    post = page_obj[len(page_obj) - 1]
+    return encode_cursor(post.pub_date, post.pk)
+
+
+def after_cursor(queryset, cursor, date_field='pub_date', descending=True):
+    """Записи после курсора в порядке (date_field, pk).
+
+    Условие по паре полей вместо OFFSET: дальние порции ленты стоят
+    столько же, сколько первые.
+    """
+    sign = '-' if descending else ''
+    queryset = queryset.order_by(f'{sign}{date_field}', f'{sign}pk')
+    if cursor is None:
+        return queryset
+    created, pk = cursor
+    lookup = 'lt' if descending else 'gt'
+    return queryset.filter(
+        Q(**{f'{date_field}__{lookup}': created})
+        | Q(**{date_field: created, f'pk__{lookup}': pk})
+    )
+
+
+def keyset_page(post_list, cursor, size):
+    """Следующие size постов после курсора и курсор для продолжения."""
+    posts = list(after_cursor(post_list, cursor)[:size + 1])
+    next_cursor = ''
+    if len(posts) > size:
+        last = posts[size - 1]
+        next_cursor = encode_cursor(last.pub_date, last.pk)
+    return posts[:size], next_cursor
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core.page_cache import invalidate_page_cache
+from posts.follow_cache import bump_followers, forget_following
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tasks import make_thumbnails
+
+
+def invalidate_pages(sender, update_fields=None, **kwargs):
+    if sender is User and update_fields == frozenset({'last_login'}):
+        return
+    invalidate_page_cache()
+
+
+for model in (Post, Comment, Group, User):
+    post_save.connect(invalidate_pages, sender=model)
+    post_delete.connect(invalidate_pages, sender=model)
+
+
+def release_image(name):
+    if name:
+        transaction.on_commit(
+            lambda: Post._meta.get_field('image').storage.delete(name)
+        )
+
+
+def queue_thumbnails(sender, instance, **kwargs):
+    name = instance.image.name
+    if name and name != getattr(instance, '_stored_image', None):
+        make_thumbnails.delay(instance.pk)
+
+
+def mark_uploaded_image(sender, instance, **kwargs):
+    # Новая загрузка берёт ссылку в хранилище, даже если совпала по
+    # содержимому со старой картинкой и имя не изменилось.
+    instance._image_uploaded = (
+        bool(instance.image) and not instance.image._committed
+    )
+
+
+def release_replaced_image(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored_image', None)
+    if stored != instance.image.name or instance._image_uploaded:
+        release_image(stored)
+    instance._stored_image = instance.image.name
+
+
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+pre_save.connect(mark_uploaded_image, sender=Post)
+# До release_replaced_image: та запоминает новое имя картинки.
+post_save.connect(queue_thumbnails, sender=Post)
+post_save.connect(release_replaced_image, sender=Post)
+post_delete.connect(release_deleted_image, sender=Post)
+
+
+def forget_changed_following(sender, instance, **kwargs):
+    # Подписка меняет followers_count профиля автора в API: сбрасывается
+    # только его версия, а не кэш всех страниц.
+    author = User.objects.filter(pk=instance.author_id).values_list(
+        'username', flat=True
+    ).first()
+
+    def forget():
+        forget_following(instance.user_id)
+        if author is not None:
+            bump_followers(author)
+
+    # Сразу и ещё раз после коммита: чтение между ними могло положить
+    # в кэш подписки из базы до изменения.
+    forget()
+    transaction.on_commit(forget)
+
+
+post_save.connect(forget_changed_following, sender=Follow)
+post_delete.connect(forget_changed_following, sender=Follow)
@@ -0,0 +1,37 @@
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import heartbeat, task
+from posts.archive import archive_path, save_archive
+from posts.images import rendition_variants
+from posts.models import Post, User
+
+
+@task()
+def make_thumbnails(post_id):
+    """Заранее создаёт миниатюры новой картинки поста.
+
+    Иначе их создавал бы первый запрос страницы с этим постом.
+    """
+    name = Post.objects.filter(pk=post_id).values_list(
+        'image', flat=True
+    ).first()
+    if not name:
+        return
+    image = Post(pk=post_id, image=name).image
+    try:
+        for geometry, options in rendition_variants():
+            get_thumbnail(image, geometry, **options)
+    finally:
+        image.close()
+
+
+@task()
+def build_archive(user_id):
+    """Собирает архив данных пользователя для страницы выгрузки.
+
+    Архив активного автора собирается дольше TASK_TIMEOUT, поэтому
+    задача продлевает блокировку по ходу записи.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is not None:
+        save_archive(user, archive_path(user_id), progress=heartbeat)
@@ -0,0 +1,515 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+
+from core.models import StoredFile
+from posts.management.commands import gc_media
+from posts.deletion import (
+    claim_job, schedule_post_deletion, schedule_user_deletion
+)
+from posts.models import Comment, DeletionJob, Follow, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class WarmCacheCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок',
+            slug='slug',
+            description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {number}')
+            for number in range(15)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_cache_reports_every_page(self):
+        """Команда прогревает существующие страницы и сообщает время."""
+        out = StringIO()
+        call_command('warm_cache', pages=5, stdout=out)
+        output = out.getvalue()
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)) + '?page=2',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn(f'мс  {url}\n', output)
+        self.assertNotIn('?page=3', output)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BackfillPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Post.objects.create(author=cls.user, text='Пост без картинки')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_backfill_dimensions(self):
+        """Команда заполняет размеры картинок у старых постов."""
+        Post.objects.update(width=None, height=None)
+        out = StringIO()
+        call_command('backfill_posts', 'dimensions', stdout=out)
+        self.assertIn('dimensions: обновлено постов 1', out.getvalue())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.width, post.height), (2, 1))
+
+    def test_backfill_placeholder(self):
+        """Команда считает превью картинок у старых постов."""
+        Post.objects.update(placeholder='')
+        call_command('backfill_posts', 'placeholder', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.placeholder.startswith('data:image/jpeg'))
+
+    def test_backfill_title(self):
+        """Команда заполняет заголовки у постов, где html уже есть."""
+        Post.objects.update(title='')
+        out = StringIO()
+        call_command('backfill_posts', 'text', stdout=out)
+        self.assertIn('text: обновлено постов 2', out.getvalue())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.title, 'Пост с картинкой')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RehomeImagesCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_rehome_shared_and_duplicate_files(self):
+        """Старые файлы переносятся по хэшу, дубли хранятся один раз."""
+        storage = Post._meta.get_field('image').storage
+        os.makedirs(storage.path('posts'), exist_ok=True)
+        originals = ('posts/first.gif', 'posts/second.gif')
+        for name in originals:
+            with open(storage.path(name), 'wb') as file:
+                file.write(SMALL_GIF)
+        user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=user, text='Пост', image=name)
+            for name in (*originals, originals[0])
+        )
+        call_command('rehome_images', batch_size=1, stdout=StringIO())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(storage.is_hashed(name))
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).refs, 3)
+        for original in originals:
+            self.assertFalse(storage.exists(original))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GcMediaCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='auth')
+        self.kept = Post.objects.create(
+            author=user, text='Пост',
+            image=SimpleUploadedFile('kept.gif', SMALL_GIF, 'image/gif'),
+        )
+        self.deleted = Post.objects.create(
+            author=user, text='Удалённый пост',
+            image=SimpleUploadedFile('gone.gif', SMALL_GIF + b'\0'),
+        )
+        self.kept_thumbnail = get_thumbnail(self.kept.image, '1x1')
+        self.stale_thumbnail = get_thumbnail(self.deleted.image, '1x1')
+        self.storage = Post._meta.get_field('image').storage
+        self.orphan = self.deleted.image.name
+        self.deleted.delete()
+        for name in (self.orphan, self.kept.image.name,
+                     self.kept_thumbnail.name, self.stale_thumbnail.name):
+            os.utime(self.storage.path(name), (0, 0))
+
+    def test_dry_run_keeps_files(self):
+        """Пробный запуск только перечисляет лишние файлы."""
+        out = StringIO()
+        call_command('gc_media', dry_run=True, stdout=out)
+        self.assertIn(self.orphan, out.getvalue())
+        self.assertIn(self.stale_thumbnail.name, out.getvalue())
+        self.assertTrue(self.storage.exists(self.orphan))
+        self.assertTrue(self.stale_thumbnail.exists())
+
+    def test_orphans_and_stale_thumbnails_removed(self):
+        """Удаляются только файлы и миниатюры без ссылок из постов."""
+        call_command('gc_media', stdout=StringIO())
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertFalse(StoredFile.objects.filter(name=self.orphan).exists())
+        self.assertFalse(self.stale_thumbnail.exists())
+        self.assertIsNone(default.kvstore.get(self.stale_thumbnail))
+        self.assertTrue(self.storage.exists(self.kept.image.name))
+        self.assertTrue(self.kept_thumbnail.exists())
+
+    def test_reuploaded_file_kept(self):
+        """Файл, который заново загрузили во время обхода, не удаляется."""
+        command = gc_media.Command()
+        remove_image = command.remove_image
+
+        def upload_during_walk(name, refs):
+            StoredFile.acquire(name, len(SMALL_GIF) + 1)
+            return remove_image(name, refs)
+
+        command.remove_image = upload_during_walk
+        call_command(command, stdout=StringIO())
+        self.assertTrue(self.storage.exists(self.orphan))
+        self.assertEqual(StoredFile.objects.get(name=self.orphan).refs, 2)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WIDTHS=(),
+    THUMBNAIL_ALTERNATE_FORMATS=(),
+)
+class GenerateThumbnailsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(
+                author=user, text='Пост',
+                image=SimpleUploadedFile(f'{number}.gif', SMALL_GIF + suffix),
+            )
+            for number, suffix in enumerate((b'', b'\0'))
+        ]
+        cls.checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def generate(self, **options):
+        out = StringIO()
+        call_command(
+            'generate_thumbnails', processes=0, checkpoint=self.checkpoint,
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_resume_and_skip_existing(self):
+        """Команда продолжает с сохранённой позиции и не повторяет работу."""
+        with open(self.checkpoint, 'w') as file:
+            file.write(str(self.posts[0].pk))
+        output = self.generate()
+        self.assertIn('Картинок: 1, новых миниатюр: 2,', output)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        output = self.generate(restart=True)
+        self.assertIn('Картинок: 2, новых миниатюр: 2,', output)
+        self.assertIn('картинок/с', output)
+
+
+class ExportDataCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Заголовок', slug='slug', description='Описание'
+        )
+        cls.old, cls.new = [
+            Post.objects.create(author=cls.user, group=cls.group, text=text)
+            for text in ('Старый пост', 'Новый пост')
+        ]
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+
+    def test_export_ndjson(self):
+        """Каждая таблица выгружается объектом JSON на строку."""
+        out = StringIO()
+        call_command('export_data', output=self.output, stdout=out)
+        with open(os.path.join(self.output, 'posts.ndjson')) as file:
+            posts = [json.loads(line) for line in file]
+        self.assertEqual(
+            [post['text'] for post in posts], ['Старый пост', 'Новый пост']
+        )
+        self.assertEqual(posts[0]['pub_date'], self.old.pub_date.isoformat())
+        self.assertIn(
+            f'--since {self.new.pub_date.isoformat()}', out.getvalue()
+        )
+        with open(os.path.join(self.output, 'follows.ndjson')) as file:
+            self.assertEqual(json.loads(file.read()), {
+                'id': Follow.objects.get().pk,
+                'user_id': self.user.pk,
+                'author_id': self.author.pk,
+            })
+
+    def test_export_gzip_csv_since(self):
+        """--since оставляет только новые записи, --gzip сжимает файл."""
+        call_command(
+            'export_data', 'posts', format='csv', gzip=True,
+            since=self.old.pub_date.isoformat(), output=self.output,
+            stdout=StringIO(),
+        )
+        path = os.path.join(self.output, 'posts.csv.gz')
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual([row['text'] for row in rows], ['Новый пост'])
+        self.assertEqual(rows[0]['group_id'], str(self.group.pk))
+
+
+class ImportDataCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок', slug='slug', description='Описание'
+        )
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        self.checkpoint = os.path.join(self.output, 'checkpoint')
+
+    def import_data(self, *files, **options):
+        call_command(
+            'import_data', *(os.path.join(self.output, f) for f in files),
+            checkpoint=self.checkpoint, stdout=StringIO(), **options
+        )
+
+    def test_export_import_round_trip(self):
+        """Выгрузка export_data загружается обратно с теми же pk и датами."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Текст поста'
+        )
+        call_command('export_data', output=self.output, stdout=StringIO())
+        Post.objects.all().delete()
+        self.import_data('posts.ndjson', batch_size=1)
+        imported = Post.objects.get()
+        self.assertEqual(imported.pk, post.pk)
+        self.assertEqual(imported.pub_date, post.pub_date)
+        self.assertEqual(imported.group, self.group)
+        self.assertEqual(imported.text_html, '<p>Текст поста</p>')
+        self.assertFalse(os.path.exists(self.checkpoint))
+        new = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertGreater(new.pk, post.pk)
+
+    def test_import_resolves_names_and_resumes(self):
+        """Авторы и группы ищутся по имени, загруженные строки пропускаются."""
+        path = os.path.join(self.output, 'posts.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.DictWriter(file, ('text', 'author', 'group'))
+            writer.writeheader()
+            writer.writerow(
+                {'text': 'Пропущенный', 'author': 'auth', 'group': 'slug'}
+            )
+            writer.writerow(
+                {'text': 'Новый автор', 'author': 'new', 'group': 'new'}
+            )
+        with open(self.checkpoint, 'w') as file:
+            json.dump({path: 1}, file)
+        self.import_data('posts.csv')
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Новый автор')
+        self.assertEqual(post.author.username, 'new')
+        self.assertEqual(post.group.slug, 'new')
+
+    def test_import_counts_inserted_and_refs_images(self):
+        """Пропущенные по конфликту строки не считаются, картинки учтены."""
+        media = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            post = Post.objects.create(
+                author=self.user, text='Пост',
+                image=SimpleUploadedFile('a.gif', b'GIF89a'),
+            )
+            with open(os.path.join(self.output, 'posts.ndjson'), 'w') as file:
+                for pk, text in ((post.pk, 'Дубль'), (None, 'Копия')):
+                    file.write(json.dumps({
+                        'id': pk, 'text': text, 'author': 'auth',
+                        'image': post.image.name,
+                    }) + '\n')
+            stdout = StringIO()
+            call_command(
+                'import_data', os.path.join(self.output, 'posts.ndjson'),
+                checkpoint=self.checkpoint, stdout=stdout,
+            )
+        self.assertIn('Загружено строк: 1 ', stdout.getvalue())
+        self.assertEqual(Post.objects.get(pk=post.pk).text, 'Пост')
+        self.assertEqual(StoredFile.objects.get(name=post.image.name).refs, 2)
+
+
+class RunDeletionsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост автора')
+        cls.other_post = Post.objects.create(
+            author=cls.reader, text='Пост читателя'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий читателя'
+        )
+        Comment.objects.create(
+            post=cls.other_post, author=cls.author, text='Ответ автора'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.reader)
+
+    def run_deletions(self):
+        call_command('run_deletions', batch_size=1, stdout=StringIO())
+
+    def test_user_deleted_in_batches(self):
+        """Пользователь сразу скрыт, а потом удалён со всеми записями."""
+        job = schedule_user_deletion(self.author)
+        self.assertEqual(job.total, 6)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Пост автора')
+        self.assertContains(response, 'Пост читателя')
+        self.run_deletions()
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertEqual((job.deleted, job.progress), (6, 100))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertQuerysetEqual(
+            Post.objects.all(), [repr(self.other_post)]
+        )
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_post_deleted_with_comments(self):
+        job = schedule_post_deletion(self.post)
+        self.run_deletions()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.deleted), (DeletionJob.DONE, 2))
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertEqual(Comment.objects.get().post, self.other_post)
+
+    def test_scheduled_post_hidden(self):
+        """Пост пропадает с сайта сразу, ещё до фонового удаления."""
+        schedule_post_deletion(self.post)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Пост автора')
+        self.assertContains(response, 'Пост читателя')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_second_schedule_refused(self):
+        """Пока задание ждёт или идёт, второе на тот же объект не ставится."""
+        job = schedule_post_deletion(self.post)
+        self.assertIsNone(schedule_post_deletion(self.post))
+        claim_job()
+        self.assertIsNone(schedule_post_deletion(self.post))
+        self.assertEqual(DeletionJob.objects.get(), job)
+        self.assertIsNotNone(schedule_user_deletion(self.author))
+        self.assertIsNone(schedule_user_deletion(self.author))
+
+    def test_progress_in_admin(self):
+        schedule_post_deletion(self.post)
+        self.client.force_login(
+            User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        )
+        response = self.client.get(
+            reverse('admin:posts_deletionjob_changelist')
+        )
+        self.assertContains(response, '0 из 2 (0%)')
+
+    def test_own_comments_counted_once(self):
+        """Комментарий автора к своему посту входит в total один раз."""
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свой комментарий'
+        )
+        job = schedule_user_deletion(self.author)
+        self.assertEqual(job.total, 7)
+        self.run_deletions()
+        job.refresh_from_db()
+        self.assertEqual((job.deleted, job.progress), (7, 100))
+
+    def test_abandoned_job_reclaimed(self):
+        """Задание умершего воркера подхватывается, живое — нет."""
+        job = schedule_post_deletion(self.post)
+        self.assertEqual(claim_job(), job)
+        self.assertIsNone(claim_job())
+        DeletionJob.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(claim_job(), job)
+
+    def test_admin_retry_skips_running_jobs(self):
+        running = schedule_post_deletion(self.post)
+        claim_job()
+        failed = schedule_post_deletion(self.other_post)
+        DeletionJob.objects.filter(pk=failed.pk).update(
+            status=DeletionJob.FAILED
+        )
+        self.client.force_login(
+            User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        )
+        self.client.post(reverse('admin:posts_deletionjob_changelist'), {
+            'action': 'retry',
+            '_selected_action': [running.pk, failed.pk],
+        })
+        running.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertEqual(running.status, DeletionJob.RUNNING)
+        self.assertEqual(failed.status, DeletionJob.PENDING)
@@ -0,0 +1,83 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Заголовок', slug='slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост <в группе>'
+        )
+        Post.objects.create(author=cls.author, text='Пост без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_formats(self):
+        """Ленты отдаются в RSS, Atom и JSON Feed."""
+        content_types = {
+            'rss': 'application/rss+xml; charset=utf-8',
+            'atom': 'application/atom+xml; charset=utf-8',
+            'json': 'application/feed+json; charset=utf-8',
+        }
+        for kind, content_type in content_types.items():
+            with self.subTest(kind=kind):
+                response = self.client.get(reverse('posts:feed', args=(kind,)))
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertContains(response, 'Пост без группы')
+                self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get(reverse('posts:feed', args=('xml',)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_group_and_author_feeds(self):
+        """Ленты группы и автора содержат только их посты."""
+        response = self.client.get(
+            reverse('posts:group_feed', args=(self.group.slug, 'json'))
+        )
+        items = json.loads(response.content)['items']
+        self.assertEqual([item['title'] for item in items], [self.post.text])
+        self.assertEqual(items[0]['content_html'], self.post.text_html)
+        self.assertEqual(items[0]['authors'], [{'name': 'auth'}])
+        response = self.client.get(
+            reverse('posts:author_feed', args=('auth', 'rss'))
+        )
+        self.assertContains(response, '&lt;в группе&gt;')
+        response = self.client.get(
+            reverse('posts:author_feed', args=('nobody', 'rss'))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get(self):
+        """Читалка с актуальным ETag получает 304 без запросов к БД."""
+        url = reverse('posts:feed', args=('atom',))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый пост')
+
+    def test_description_without_stored_html(self):
+        """Пост без сохранённого html всё равно попадает в ленту с текстом."""
+        Post.objects.filter(pk=self.post.pk).update(text_html='')
+        response = self.client.get(
+            reverse('posts:group_feed', args=(self.group.slug, 'json'))
+        )
+        items = json.loads(response.content)['items']
+        self.assertEqual(
+            items[0]['content_html'], '<p>Пост &lt;в группе&gt;</p>'
+        )
@@ -1,5 +1,11 @@
 import tempfile
 import shutil
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
 
 from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
@@ -126,7 +132,73 @@ class PostFormTests(TestCase):
         self.assertRedirects(response, reverse(
             'posts:profile', kwargs={'username': PostFormTests.user.username}
         ))
-        self.assertEqual(post.image, 'posts/small.gif')
+        self.assertRegex(
+            post.image.name, r'^posts/\w\w/\w\w/[0-9a-f]{64}\.gif$'
+        )
+        self.assertEqual((post.width, post.height), (2, 1))
+        self.assertTrue(post.placeholder.startswith('data:image/jpeg;base64,'))
+
+    def post_image(self, image, name='photo.jpg', **options):
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', **options)
+        uploaded = SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Фото', 'image': uploaded},
+        )
+
+    @override_settings(IMAGE_MAX_SIDE=100, IMAGE_WORKERS=1)
+    def test_image_normalized(self):
+        """Картинка пересохраняется без EXIF и уменьшается."""
+        Post.objects.all().delete()
+        exif = Image.Exif()
+        exif[0x0110] = 'Camera'
+        self.post_image(Image.new('RGB', (300, 200)), exif=exif.tobytes())
+        post = Post.objects.get()
+        self.assertEqual((post.width, post.height), (100, 67))
+        with Image.open(post.image.path) as image:
+            self.assertNotIn('exif', image.info)
+            self.assertTrue(image.info.get('progressive'))
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_huge_image_rejected(self):
+        """Картинка с лишними пикселями отклоняется до сохранения."""
+        Post.objects.all().delete()
+        response = self.post_image(Image.new('RGB', (20, 20)))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка 20×20 слишком большая.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_WORKERS=1)
+    def test_slow_image_rejected(self):
+        """Если пересохранение не уложилось в IMAGE_TIMEOUT — ошибка формы."""
+        Post.objects.all().delete()
+        with mock.patch('posts.uploads.get_executor') as executor:
+            future = executor.return_value.submit.return_value
+            future.result.side_effect = TimeoutError
+            response = self.post_image(Image.new('RGB', (20, 20)))
+        future.cancel.assert_called_once()
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка обрабатывается слишком долго.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_WORKERS=1)
+    def test_broken_pool_rejected(self):
+        """Упавший процесс пула даёт ошибку формы, а пул пересоздаётся."""
+        Post.objects.all().delete()
+        with mock.patch('posts.uploads.get_executor') as executor, \
+                mock.patch('posts.uploads.reset_executor') as reset:
+            future = executor.return_value.submit.return_value
+            future.result.side_effect = BrokenProcessPool
+            with self.assertLogs('posts.uploads', 'WARNING'):
+                response = self.post_image(Image.new('RGB', (20, 20)))
+        reset.assert_called_once()
+        self.assertFormError(
+            response, 'form', 'image', 'Не удалось обработать картинку.'
+        )
+        self.assertFalse(Post.objects.exists())
 
     def test_create_comment(self):
         """Проверка Comment"""
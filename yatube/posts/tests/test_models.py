@@ -1,6 +1,14 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 
+from core.models import StoredFile
+from posts.images import thumbnail_size
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -23,6 +31,61 @@ class PostModelTest(TestCase):
             PostModelTest.post.text[:Post.TEST_NUM_POSTS]
         )
 
+    def test_text_rendered_on_save(self):
+        """При сохранении текст поста переводится в экранированный html."""
+        post = Post.objects.create(
+            author=self.user, text='<b>жирный</b>\n\nабзац'
+        )
+        self.assertEqual(
+            post.text_html, '<p>&lt;b&gt;жирный&lt;/b&gt;</p>\n\n<p>абзац</p>'
+        )
+        self.assertEqual(post.excerpt_html, '')
+
+    @override_settings(POST_EXCERPT_LENGTH=10)
+    def test_long_text_has_excerpt(self):
+        """У длинного поста сохраняется начало текста для лент."""
+        post = Post.objects.create(author=self.user, text='длинный ' * 10)
+        self.assertEqual(post.excerpt_html, '<p>длинный д…</p>')
+
+    @override_settings(POST_TITLE_LENGTH=10)
+    def test_title_truncated_on_save(self):
+        """Заголовок поста обрезается при сохранении, а не в шаблоне."""
+        post = Post.objects.create(author=self.user, text='длинный ' * 10)
+        self.assertEqual(post.title, 'длинный д…')
+
+    def test_unreadable_image_measured_once(self):
+        """Нечитаемая картинка получает размеры 0 и не перечитывается."""
+        media = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            post = Post.objects.create(
+                author=self.user, text='Пост',
+                image=SimpleUploadedFile('broken.jpg', b'not an image'),
+            )
+            self.assertEqual((post.width, post.height), (0, 0))
+            with mock.patch('posts.models.image_dimensions') as dimensions:
+                post.text = 'Новый текст'
+                post.save()
+            dimensions.assert_not_called()
+
+    @mock.patch('posts.signals.transaction.on_commit', lambda func: func())
+    def test_same_image_reupload_keeps_one_ref(self):
+        """Повторная загрузка той же картинки не копит ссылки на файл."""
+        media = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            post = Post.objects.create(
+                author=self.user, text='Пост',
+                image=SimpleUploadedFile('a.gif', b'GIF89a'),
+            )
+            post.image = SimpleUploadedFile('b.gif', b'GIF89a')
+            post.save()
+            stored = StoredFile.objects.get(name=post.image.name)
+            self.assertEqual(stored.refs, 1)
+            post.delete()
+            self.assertFalse(StoredFile.objects.exists())
+            self.assertFalse(post.image.storage.exists(post.image.name))
+
 
 class GroupModelTest(TestCase):
     @classmethod
@@ -38,3 +101,19 @@ class GroupModelTest(TestCase):
         """Проверяем, что у моделей корректно работает __str__."""
         group = GroupModelTest.group
         self.assertEqual(str(group), group.title)
+
+
+class ThumbnailSizeTest(TestCase):
+    def test_thumbnail_size_matches_sorl(self):
+        """Размер миниатюры считается так же, как в sorl-thumbnail."""
+        cases = [
+            ((2000, 1000, '960x339'), {}, (678, 339)),
+            ((2000, 1000, '960x339'), {'crop': 'center'}, (960, 339)),
+            ((2000, 1000, '960x339'), {'padding': True}, (960, 339)),
+            ((300, 200, '960x339'), {}, (300, 200)),
+            ((300, 200, '960x339'), {'upscale': True}, (508, 339)),
+            ((1000, 500, '640'), {}, (640, 320)),
+        ]
+        for args, options, expected in cases:
+            with self.subTest(args=args, options=options):
+                self.assertEqual(thumbnail_size(*args, **options), expected)
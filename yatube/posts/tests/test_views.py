@@ -1,3 +1,7 @@
+import json
+import os
+import zipfile
+from io import BytesIO
 from math import ceil
 import tempfile
 import shutil
@@ -8,8 +12,12 @@ from django.urls import reverse
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
+from core.tasks import run_pending
+from posts.archive import save_archive
 from posts.models import Post, Group, Comment, Follow
+from posts.follow_cache import following_ids, is_following
 from posts.forms import PostForm
 
 
@@ -290,3 +298,293 @@ class PaginatorViewTest(TestCase):
                     response_unfilled_page.context['page_obj']),
                     self.posts_on_last_page
                 )
+
+    def test_more_fragments_continue_listing(self):
+        """Фрагмент продолжает ленту с курсора последнего поста страницы."""
+        listings = {
+            reverse('posts:index'): reverse('posts:index_more'),
+            reverse('posts:group_list', args=(self.group.slug,)): reverse(
+                'posts:group_list_more', args=(self.group.slug,)
+            ),
+            reverse('posts:profile', args=(self.auth.username,)): reverse(
+                'posts:profile_more', args=(self.auth.username,)
+            ),
+        }
+        for page_url, more_url in listings.items():
+            with self.subTest(page_url=page_url):
+                page = self.authorized_client.get(page_url)
+                cursor = page.context['next_cursor']
+                self.assertContains(page, f'data-cursor="{cursor}"')
+                response = self.authorized_client.get(
+                    more_url, {'cursor': cursor}
+                )
+                self.assertEqual(
+                    [post.text for post in response.context['posts']],
+                    [post.text for post in Post.objects.all()[10:]],
+                )
+                self.assertEqual(response.context['next_cursor'], '')
+                self.assertNotContains(response, '<html')
+
+    def test_index_cursor_cached_with_cards(self):
+        """Пока карточки главной берутся из кэша, курсор тоже старый."""
+        url = reverse('posts:index')
+        cursor = self.authorized_client.get(url).context['next_cursor']
+        Post.objects.create(author=self.auth, text='Самый новый пост')
+        response = self.authorized_client.get(url)
+        self.assertNotEqual(response.context['next_cursor'], cursor)
+        self.assertContains(response, f'data-cursor="{cursor}"')
+        self.assertNotContains(response, 'Самый новый пост')
+
+    def test_more_fragment_rejects_broken_cursor(self):
+        """Испорченный курсор даёт 400, а не ошибку сервера."""
+        response = self.client.get(
+            reverse('posts:index_more'), {'cursor': 'сломан'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PageCacheWithHolesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', first_name='Антон', last_name='Чехов'
+        )
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_cached_page_keeps_personal_fragments(self):
+        """Общая закэшированная страница дорисовывается для каждого."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        edit_url = reverse('posts:post_edit', kwargs={'post_id': self.post.pk})
+        anonymous = self.client.get(url).content.decode()
+        author = self.author_client.get(url).content.decode()
+        reader = self.reader_client.get(url).content.decode()
+        self.assertNotIn('<esi:include', author)
+        self.assertNotIn('Добавить комментарий', anonymous)
+        self.assertIn('Лев Толстой', author)
+        self.assertIn(edit_url, author)
+        self.assertIn('Антон Чехов', reader)
+        self.assertNotIn(edit_url, reader)
+        self.assertIn('Добавить комментарий', reader)
+
+    def test_follow_button_is_personal(self):
+        """Кнопка подписки на закэшированном профиле своя у каждого."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        follow_url = reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}
+        )
+        unfollow_url = reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}
+        )
+        self.assertIn(follow_url, self.reader_client.get(url).content.decode())
+        self.reader_client.get(follow_url)
+        self.assertIn(
+            unfollow_url, self.reader_client.get(url).content.decode()
+        )
+        self.assertNotIn(
+            follow_url, self.author_client.get(url).content.decode()
+        )
+
+    def test_post_changes_invalidate_pages(self):
+        """Изменение поста сбрасывает закэшированные страницы."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn('Новый текст', self.client.get(url).content.decode())
+
+
+class FollowCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_follow_state_without_queries(self):
+        """Подписки проверяются по закэшированному набору без запросов."""
+        for author in self.authors[:2]:
+            self.reader_client.get(
+                reverse('posts:profile_follow', args=(author.username,))
+            )
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=('author0',))
+        )
+        following_ids(User.objects.get(pk=self.reader.pk))
+        reader = User.objects.get(pk=self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(is_following(reader, self.authors[0].pk))
+            self.assertTrue(is_following(reader, self.authors[1].pk))
+            self.assertFalse(is_following(reader, self.authors[2].pk))
+
+    def test_follow_changed_elsewhere_reflected(self):
+        """Подписки, изменённые не через представления, тоже видны."""
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertFalse(is_following(reader, self.authors[0].pk))
+        follow = Follow.objects.create(
+            user=self.reader, author=self.authors[0]
+        )
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertTrue(is_following(reader, self.authors[0].pk))
+        follow.delete()
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertFalse(is_following(reader, self.authors[0].pk))
+
+    def test_listing_shows_follow_badge(self):
+        """В ленте отмечены авторы, на которых подписан пользователь."""
+        Post.objects.create(author=self.authors[0], text='Текст')
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=('author0',))
+        )
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, 'подписка</span>')
+        self.assertNotContains(
+            self.client.get(reverse('posts:index')), 'подписка</span>'
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WIDTHS=(320, 640))
+class ResponsiveImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'teal').save(buffer, 'JPEG')
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='auth'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'photo.jpg', buffer.getvalue(), 'image/jpeg'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listing_image_has_srcset(self):
+        """Картинка в ленте отдаётся лесенкой ширин и грузится лениво."""
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        for width in (320, 640, 960):
+            with self.subTest(width=width):
+                self.assertRegex(content, rf'srcset="[^"]* {width}w')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, 'loading="lazy" decoding="async"')
+
+    def test_detail_image_not_lazy(self):
+        """Главная картинка поста грузится сразу и с высоким приоритетом."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(response, 'fetchpriority="high"')
+        self.assertNotContains(response, 'loading="lazy"')
+
+    @override_settings(THUMBNAIL_ALTERNATE_FORMATS=('PNG', 'NOPE'))
+    def test_alternate_formats_in_picture(self):
+        """Дополнительные форматы выводятся в <source>, JPEG остаётся в img."""
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertRegex(
+            content, r'<picture><source type="image/png" srcset="[^"]+\.png '
+        )
+        self.assertNotIn('NOPE', content)
+        self.assertRegex(content, r'<img [^>]*src="[^"]+\.jpg"')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        buffer = BytesIO()
+        Image.new('RGB', (20, 10), 'teal').save(buffer, 'JPEG')
+        cls.image = buffer.getvalue()
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('photo.jpg', cls.image, 'image/jpeg'),
+        )
+        Comment.objects.create(
+            author=cls.user, post=cls.post, text='Комментарий'
+        )
+        Post.objects.create(
+            author=User.objects.create_user(username='other'),
+            text='Чужой пост',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_export_requires_login(self):
+        response = self.client.get(reverse('posts:export_archive'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_parallel_builds_do_not_clash(self):
+        """Две сборки одного архива не портят друг другу файл."""
+        path = os.path.join(TEMP_MEDIA_ROOT + '-exports', 'auth.zip')
+        self.addCleanup(
+            shutil.rmtree, os.path.dirname(path), ignore_errors=True
+        )
+        nested = []
+
+        def progress():
+            if not nested:
+                nested.append(save_archive(self.user, path))
+
+        save_archive(self.user, path, progress=progress)
+        with zipfile.ZipFile(path) as archive:
+            self.assertIsNone(archive.testzip())
+        self.assertEqual(os.listdir(os.path.dirname(path)), ['auth.zip'])
+
+    def test_export_built_in_background(self):
+        """Архив собирает задача, а готовый файл отдаётся владельцу."""
+        self.client.force_login(self.user)
+        url = reverse('posts:export_archive')
+        with override_settings(EXPORT_ROOT=TEMP_MEDIA_ROOT + '-exports'):
+            self.addCleanup(
+                shutil.rmtree, settings.EXPORT_ROOT, ignore_errors=True
+            )
+            self.assertEqual(self.client.get(url).status_code, 202)
+            self.assertEqual(self.client.get(url).status_code, 202)
+            self.assertEqual(run_pending()[1], 0)
+            response = self.client.get(url)
+            self.assertEqual(response['Content-Type'], 'application/zip')
+            self.assertIn('yatube-auth.zip', response['Content-Disposition'])
+            content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            profile = json.loads(archive.read('profile.json'))
+            posts = archive.read('posts.ndjson').decode().splitlines()
+            comments = archive.read('comments.ndjson').decode().splitlines()
+            image = archive.read(self.post.image.name)
+        self.assertEqual(profile['username'], 'auth')
+        self.assertEqual(
+            [json.loads(line)['text'] for line in posts], ['Пост с картинкой']
+        )
+        self.assertEqual(json.loads(comments[0])['text'], 'Комментарий')
+        self.assertEqual(image, self.post.image.read())
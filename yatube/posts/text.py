@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+def render_text(text):
+    """Экранированный html текста поста, как у фильтра linebreaks."""
+    return linebreaks(text, autoescape=True)
+
+
+def render_title(text):
+    """Короткий заголовок поста, как у фильтра truncatechars."""
+    return Truncator(text).chars(settings.POST_TITLE_LENGTH)
+
+
+def render_excerpt(text):
+    """Начало длинного поста для лент; у коротких постов пустая строка."""
+    if len(text) <= settings.POST_EXCERPT_LENGTH:
+        return ''
+    return render_text(Truncator(text).chars(settings.POST_EXCERPT_LENGTH))
@@ -0,0 +1,120 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+SAVE_OPTIONS = {
+    'JPEG': {'progressive': True, 'optimize': True},
+    'PNG': {'optimize': True},
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class NormalizeError(Exception):
+    pass
+
+
+def normalize(source, max_side, quality):
+    """Пересохраняет картинку: без EXIF, не больше max_side по длинной стороне.
+
+    source — путь к файлу на диске или его содержимое в байтах. Функция
+    выполняется в отдельном процессе, поэтому работает только с ними.
+    Возвращает новые байты или None, если картинку лучше оставить как есть.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    with Image.open(source) as image:
+        image_format = image.format
+        if getattr(image, 'is_animated', False):
+            if max(image.size) > max_side:
+                raise NormalizeError(
+                    f'Анимированная картинка больше {max_side} px'
+                )
+            return None
+        if image_format not in Image.SAVE:
+            return None
+        image.draft(image.mode, (max_side, max_side))
+        icc_profile = image.info.get('icc_profile')
+        normalized = ImageOps.exif_transpose(image)
+    normalized.thumbnail((max_side, max_side), Image.LANCZOS)
+    options = dict(SAVE_OPTIONS.get(image_format, {}))
+    if image_format == 'JPEG':
+        options['quality'] = quality
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    buffer = BytesIO()
+    normalized.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(settings.IMAGE_WORKERS)
+        return _executor
+
+
+def reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+atexit.register(reset_executor)
+
+
+def normalize_upload(upload):
+    """Нормализует загруженную картинку в пуле процессов IMAGE_WORKERS.
+
+    Большие загрузки Django уже сохранил во временный файл, и воркер читает
+    его с диска; маленькие передаются байтами. При IMAGE_WORKERS = 0
+    картинка обрабатывается прямо в потоке запроса.
+
+    Поток запроса всё равно ждёт результата, но не дольше IMAGE_TIMEOUT
+    секунд: дольше обрабатываемая картинка отклоняется NormalizeError.
+    Так же отклоняется картинка, на которой упал декодер или весь
+    процесс пула: пользователь получает ошибку формы, а не 500.
+    """
+    if hasattr(upload, 'temporary_file_path'):
+        source = upload.temporary_file_path()
+    else:
+        upload.seek(0)
+        source = upload.read()
+    args = (source, settings.IMAGE_MAX_SIDE, settings.IMAGE_QUALITY)
+    try:
+        if settings.IMAGE_WORKERS:
+            future = get_executor().submit(normalize, *args)
+            try:
+                data = future.result(timeout=settings.IMAGE_TIMEOUT)
+            except TimeoutError:
+                future.cancel()
+                raise NormalizeError('Картинка обрабатывается слишком долго.')
+            except BrokenProcessPool:
+                # Процесс пула убит, например, по нехватке памяти: следующая
+                # загрузка получит новый пул.
+                reset_executor()
+                raise
+        else:
+            data = normalize(*args)
+    except NormalizeError:
+        raise
+    except Exception as error:
+        logger.warning('Картинка %s не обработана', upload.name, exc_info=True)
+        raise NormalizeError('Не удалось обработать картинку.') from error
+    if data is None:
+        upload.seek(0)
+        return upload
+    return SimpleUploadedFile(upload.name, data, upload.content_type)
@@ -1,20 +1,44 @@
 from django.urls import path
 
-from posts import views
+from posts import feeds, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('more/', views.index_more, name='index_more'),
+    path('feed/<str:kind>/', feeds.site_feed, name='feed'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/more/',
+        views.group_posts_more,
+        name='group_list_more'
+    ),
+    path(
+        'group/<slug:slug>/feed/<str:kind>/',
+        feeds.group_feed,
+        name='group_feed'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/more/',
+        views.profile_more,
+        name='profile_more'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:kind>/',
+        feeds.author_feed,
+        name='author_feed'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path('export/', views.export_archive, name='export_archive'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/more/', views.follow_index_more, name='follow_index_more'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,11 +1,19 @@
 from django.conf import settings
+from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, render
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 
+from core.files import serve_file
+from core.page_cache import cache_page_with_holes
+from core.ratelimit import ratelimit
+from core.tasks import is_queued
+from posts.archive import archive_path, archive_ready
 from posts.models import Group, Post, Follow, User
 from posts.forms import PostForm, CommentForm
+from posts.pagination import decode_cursor, keyset_page, page_cursor
+from posts.tasks import build_archive
 
 
 def pagginator(page_number, post_list):
@@ -13,44 +21,87 @@ def pagginator(page_number, post_list):
     return paginator.get_page(page_number)
 
 
+def listing_context(request, post_list):
+    page_obj = pagginator(request.GET.get('page'), post_list)
+    return {'page_obj': page_obj, 'next_cursor': page_cursor(page_obj)}
+
+
+def render_more(request, post_list, **context):
+    """Следующая порция карточек ленты без обвязки страницы.
+
+    Её подгружает static/js/feed.js; курсор продолжения лежит в конце
+    фрагмента.
+    """
+    cursor = request.GET.get('cursor')
+    try:
+        cursor = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return HttpResponseBadRequest()
+    posts, next_cursor = keyset_page(post_list, cursor, settings.NUM_POSTS)
+    context.update(posts=posts, next_cursor=next_cursor)
+    return render(request, 'posts/includes/post_batch.html', context)
+
+
+@cache_page_with_holes
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('group', 'author')
-    context = {
-        'page_obj': pagginator(request.GET.get('page'), post_list),
-    }
+    post_list = Post.objects.visible().select_related('group', 'author')
+    context = listing_context(request, post_list)
     return render(request, template, context)
 
 
+@cache_page_with_holes
+def index_more(request):
+    post_list = Post.objects.visible().select_related('group', 'author')
+    return render_more(
+        request, post_list, show_link=True, profile_display=True
+    )
+
+
+@cache_page_with_holes
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author')
+    post_list = group.posts.visible().select_related('author')
     context = {
         'group': group,
-        'page_obj': pagginator(request.GET.get('page'), post_list),
+        **listing_context(request, post_list),
     }
     return render(request, template, context)
 
 
+@cache_page_with_holes
+def group_posts_more(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    post_list = group.posts.visible().select_related('author', 'group')
+    return render_more(request, post_list)
+
+
+@cache_page_with_holes
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and request.user.follower.filter(
-        author=author).exists()
+    # Неактивные — в том числе ждущие фонового удаления — скрыты.
+    author = get_object_or_404(User, username=username, is_active=True)
     post_list = author.posts.select_related('group')
     context = {
         'author': author,
-        'page_obj': pagginator(request.GET.get('page'), post_list),
-        'following': following,
+        **listing_context(request, post_list),
     }
     return render(request, template, context)
 
 
+@cache_page_with_holes
+def profile_more(request, username):
+    author = get_object_or_404(User, username=username, is_active=True)
+    post_list = author.posts.select_related('group', 'author')
+    return render_more(request, post_list, show_link=True)
+
+
+@cache_page_with_holes
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
     post = get_object_or_404(
-        Post.objects.select_related('group', 'author'),
+        Post.objects.visible().select_related('group', 'author'),
         pk=post_id
     )
     comments = post.comments.select_related('author')
@@ -63,6 +114,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@ratelimit('post_create', methods=('POST',))
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -104,11 +156,12 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit('add_comment', methods=('POST',))
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
-        comment.post = get_object_or_404(Post, pk=post_id)
+        comment.post = get_object_or_404(Post.objects.visible(), pk=post_id)
         comment.author = request.user
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
@@ -116,15 +169,23 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(
+    post_list = Post.objects.visible().filter(
         author__following__user=request.user).select_related('group', 'author')
-    context = {
-        'page_obj': pagginator(request.GET.get('page'), post_list),
-    }
+    context = listing_context(request, post_list)
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+def follow_index_more(request):
+    post_list = Post.objects.visible().filter(
+        author__following__user=request.user).select_related('group', 'author')
+    return render_more(
+        request, post_list, show_link=True, profile_display=True
+    )
+
+
+@login_required
+@ratelimit('follow')
 def profile_follow(request, username):
     follow_user = get_object_or_404(User, username=username)
     if follow_user != request.user:
@@ -133,6 +194,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@ratelimit('follow')
 def profile_unfollow(request, username):
     follow_author = get_object_or_404(User, username=username)
     get_object_or_404(
@@ -141,3 +203,28 @@ def profile_unfollow(request, username):
         author=follow_author
     ).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+def export_archive(request):
+    """Zip со всеми данными пользователя.
+
+    Архив собирает фоновая задача build_archive, а не запрос: пока его
+    нет, страница просит зайти позже. Готовый файл отдаётся через
+    serve_file, а при настроенном SENDFILE_HEADER — самим прокси.
+    """
+    user_id = request.user.pk
+    if not archive_ready(user_id):
+        if not is_queued(build_archive, user_id):
+            build_archive.delay(user_id)
+        return render(request, 'posts/export.html', status=202)
+    offload = archive_path(user_id)
+    if settings.SENDFILE_HEADER == 'X-Accel-Redirect':
+        offload = f'{settings.EXPORT_SENDFILE_URL}{user_id}.zip'
+    response = serve_file(
+        request, archive_path(user_id), 'private, no-cache', offload=offload
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="yatube-{request.user.username}.zip"'
+    )
+    return response
@@ -0,0 +1,64 @@
+// Бесконечная лента: когда читатель долистывает до конца списка постов,
+// следующая порция карточек подгружается фрагментом с адреса data-more-url.
+// Без JavaScript остаётся обычная постраничная навигация.
+(function () {
+  'use strict';
+
+  if (!window.fetch || !('IntersectionObserver' in window)) {
+    return;
+  }
+
+  function enhance(feed) {
+    var cursor = feed.dataset.cursor;
+    if (!cursor) {
+      return;
+    }
+    var pagination = document.querySelector('nav[aria-label="Page navigation"]');
+    if (pagination) {
+      pagination.hidden = true;
+    }
+    var sentinel = document.createElement('div');
+    feed.after(sentinel);
+    var loading = false;
+
+    var observer = new IntersectionObserver(function (entries) {
+      if (!entries[0].isIntersecting || loading) {
+        return;
+      }
+      loading = true;
+      var url = feed.dataset.moreUrl + '?cursor=' + encodeURIComponent(cursor);
+      fetch(url, {credentials: 'same-origin'})
+        .then(function (response) {
+          if (!response.ok) {
+            throw new Error(response.status);
+          }
+          return response.text();
+        })
+        .then(function (html) {
+          feed.insertAdjacentHTML('beforeend', html);
+          var marker = feed.querySelector('[data-cursor]');
+          cursor = marker ? marker.dataset.cursor : '';
+          if (marker) {
+            marker.remove();
+          }
+          if (!cursor) {
+            observer.disconnect();
+            sentinel.remove();
+          }
+          loading = false;
+        })
+        .catch(function () {
+          // Не вышло — возвращаем обычную навигацию по страницам.
+          observer.disconnect();
+          if (pagination) {
+            pagination.hidden = false;
+          }
+        });
+    }, {rootMargin: '600px'});
+    observer.observe(sentinel);
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('[data-more-url]').forEach(enhance);
+  });
+}());
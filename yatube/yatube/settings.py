@@ -31,10 +31,29 @@ ALLOWED_HOSTS = [
 ]
 
 NUM_POSTS = 10
+# Сколько последних постов попадает в RSS, Atom и JSON Feed.
+FEED_SIZE = 20
+# Сколько записей отдаёт за раз JSON API.
+API_PAGE_SIZE = 20
+# Длинные посты в лентах обрезаются до стольких символов.
+POST_EXCERPT_LENGTH = 600
+# Заголовок страницы поста — столько первых символов текста.
+POST_TITLE_LENGTH = 30
+PAGE_CACHE_TIMEOUT = 60 * 5
+FOLLOWING_CACHE_TIMEOUT = 60 * 60
+COMPRESS_MIN_LENGTH = 200
+COMPRESS_LEVEL = 6
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма копятся в таблице исходящих, а воркер отправляет их пачками
+# через OUTBOX_EMAIL_BACKEND, не быстрее EMAIL_RATE_LIMIT писем в секунду.
+# Пачка не больше EMAIL_BATCH_SIZE, чтобы уложиться в TASK_TIMEOUT.
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_RATE_LIMIT = 10
+EMAIL_BATCH_SIZE = 1000
+EMAIL_MAX_ATTEMPTS = 5
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -47,13 +66,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
-    'core',
+    'core.apps.CoreConfig',
     'about',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -134,8 +155,69 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_MAX_AGE = 60 * 60 * 24 * 30
+# 'X-Accel-Redirect' для nginx или 'X-Sendfile' для apache и lighttpd:
+# тогда файлы из MEDIA_ROOT отдаёт сам прокси.
+SENDFILE_HEADER = None
+SENDFILE_URL = '/protected-media/'
+# Архивы данных пользователей собирает фоновая задача в закрытый от
+# MEDIA_URL каталог; готовый архив отдаётся владельцу EXPORT_MAX_AGE секунд.
+EXPORT_ROOT = os.path.join(BASE_DIR, 'exports')
+EXPORT_MAX_AGE = 60 * 60 * 24
+EXPORT_SENDFILE_URL = '/protected-exports/'
+
+# Миниатюры картинок постов, которые выводят шаблоны: имя для тега
+# {% responsive_image %}, геометрия и параметры sorl-thumbnail.
+THUMBNAIL_RENDITIONS = {
+    'card': ('960x339', {'padding': True, 'upscale': True}),
+    'detail': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Лесенка ширин миниатюр для srcset и подсказка браузеру о ширине слота.
+THUMBNAIL_WIDTHS = (320, 640, 960)
+THUMBNAIL_SIZES = '(max-width: 992px) 100vw, 960px'
+# Дополнительные форматы миниатюр; недоступные в сборке Pillow пропускаются.
+THUMBNAIL_ALTERNATE_FORMATS = ('WEBP',)
+# Размер в пикселях превью, встраиваемого в страницу до загрузки картинки.
+IMAGE_PLACEHOLDER_SIZE = 16
+
+# Загрузки больше этого размера Django пишет во временный файл, а не в память.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+# Ограничения загружаемых картинок: проверяются по заголовку до декодирования.
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+# Картинки пересохраняются без EXIF и уменьшаются до IMAGE_MAX_SIDE.
+IMAGE_MAX_SIDE = 2560
+IMAGE_QUALITY = 85
+# Процессов для пересохранения; 0 — обрабатывать в потоке запроса.
+IMAGE_WORKERS = 2
+# Сколько секунд запрос ждёт пересохранения, прежде чем отклонить картинку.
+IMAGE_TIMEOUT = 15
+
+# Очередь фоновых задач: процессы run_tasks, сколько секунд задача считается
+# занятой воркером и паузы между повторами упавших задач. Задачи дольше
+# TASK_TIMEOUT должны продлевать блокировку через core.tasks.heartbeat().
+TASK_WORKERS = 2
+TASK_TIMEOUT = 60 * 5
+TASK_RETRY_DELAY = 10
+TASK_MAX_RETRY_DELAY = 60 * 60
+# Сколько секунд задание run_deletions считается занятым без продвижения.
+DELETION_TIMEOUT = 60 * 5
+
+# Пределы частоты записи для core.ratelimit: запросов за секунду, минуту,
+# час или сутки на пользователя, а для анонимов — на IP. Счётчики лежат
+# в кэше: с LocMemCache предел считается в каждом процессе отдельно, для
+# общего предела нужен общий кэш вроде Redis или Memcached.
+RATE_LIMITS = {
+    'post_create': '10/m',
+    'add_comment': '20/m',
+    'follow': '30/m',
+}
 
 CACHES = {
     'default': {